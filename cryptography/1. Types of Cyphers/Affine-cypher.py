@@ -1,74 +1,229 @@
-import math
+import os
+from functools import lru_cache
 
-def gcd(a, b):
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from buffers import byte_views, translate_into
+from script_loader import load_script
+
+# number_theory.py lives with the RSA scripts; load_script() imports it by path, so sys.path is left alone.
+number_theory = load_script(os.path.join(os.pardir, "2. Public Key Cryptography", "number_theory.py"))
+
+
+class _AffineTextTable(dict):
     """
-    Compute the Greatest Common Divisor (GCD) of two integers.
+    Translation table for str.translate that resolves non-ASCII characters on first use.
+    """
+
+    def __init__(self, byte_table, a, b):
+        super().__init__()
+        self.a = a
+        self.b = b
+        for code in range(128):
+            self[code] = byte_table[code]
+
+    def __missing__(self, code):
+        char = chr(code)
+        if char.isalpha():
+            value = (self.a * (ord(char.upper()) - 65) + self.b) % 26 + 65
+        else:
+            value = code
+        self[code] = value
+        return value
+
+
+class AffineCipher:
+    """
+    An Affine Cipher key (a, b) with its lookup tables precomputed.
+
+    The key is validated and the modular inverse of a is computed once. Encryption and decryption
+    then use 256-entry lookup tables: bytes.translate for str/bytes input, or a NumPy gather for
+    large uint8 buffers.
     """
-    while b != 0:
-        a, b = b, a % b
-    return a
 
-def mod_inverse(a, m):
+    def __init__(self, a, b):
+        try:
+            a_inv = number_theory.mod_inverse(a, 26)
+        except ValueError:
+            raise ValueError(f"a={a} must be coprime to 26.") from None
+        self.a = a
+        self.b = b
+        self.a_inv = a_inv
+        self.encrypt_table = self._build_table(a, b)
+        # Decryption is itself an affine map: x = a_inv * (y - b) = a_inv * y - a_inv * b.
+        self.decrypt_table = self._build_table(a_inv, -a_inv * b)
+        self._text_tables = {
+            True: _AffineTextTable(self.encrypt_table, a, b),
+            False: _AffineTextTable(self.decrypt_table, a_inv, -a_inv * b),
+        }
+        self._array_tables = None
+
+    @staticmethod
+    def _build_table(a, b):
+        table = bytearray(range(256))
+        for i in range(26):
+            table[65 + i] = table[97 + i] = (a * i + b) % 26 + 65
+        return bytes(table)
+
+    def __repr__(self):
+        return f"AffineCipher(a={self.a}, b={self.b})"
+
+    def table(self, encrypt=True):
+        """
+        Returns the 256-entry lookup table for one direction.
+        """
+        return self.encrypt_table if encrypt else self.decrypt_table
+
+    def encrypt(self, data):
+        """
+        Encrypts a str or bytes-like object, returning the same kind of object.
+        """
+        return self.transform(data, encrypt=True)
+
+    def decrypt(self, data):
+        """
+        Decrypts a str or bytes-like object, returning the same kind of object.
+        """
+        return self.transform(data, encrypt=False)
+
+    def transform(self, data, encrypt=True):
+        """
+        Encrypts or decrypts a str or bytes-like object.
+
+        Args:
+            data (str or bytes-like): The text or data to be encrypted or decrypted.
+            encrypt (bool): True to encrypt, False to decrypt.
+
+        Returns:
+            str or bytes: The encrypted or decrypted text or data.
+        """
+        if isinstance(data, str):
+            return data.translate(self._text_tables[encrypt])
+        return bytes(data).translate(self.table(encrypt))
+
+    def transform_into(self, data, out, encrypt=True):
+        """
+        Encrypts or decrypts any buffer into a caller-provided one, without allocating anything the size of the input.
+
+        Args:
+            data (bytes-like): The data to be encrypted or decrypted (bytes, bytearray, memoryview, mmap, ...).
+            out (bytes-like): A writable buffer of at least len(data) bytes; it may be data itself (in place).
+            encrypt (bool): True to encrypt, False to decrypt.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        source, target = byte_views(data, out)
+        translate_into(source, target, self.table(encrypt))
+        return len(source)
+
+    def transform_array(self, array, encrypt=True, out=None):
+        """
+        Encrypts or decrypts a NumPy uint8 array with a vectorized table lookup.
+
+        Args:
+            array (numpy.ndarray): The uint8 data to be encrypted or decrypted.
+            encrypt (bool): True to encrypt, False to decrypt.
+            out (numpy.ndarray): Optional uint8 array of the same shape to write the result into.
+
+        Returns:
+            numpy.ndarray: The encrypted or decrypted data.
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required for transform_array().")
+        if self._array_tables is None:
+            self._array_tables = {
+                True: np.frombuffer(self.encrypt_table, dtype=np.uint8),
+                False: np.frombuffer(self.decrypt_table, dtype=np.uint8),
+            }
+        return np.take(self._array_tables[encrypt], array, out=out, mode="wrap")
+
+
+@lru_cache(maxsize=256)
+def get_cipher(a, b):
     """
-    Compute the modular inverse of a modulo m.
+    Returns a cached AffineCipher for the key (a, b).
     """
-    if gcd(a, m) != 1:
-        return None
-    
-    u1, u2, u3 = 1, 0, a
-    v1, v2, v3 = 0, 1, m
-    
-    while v3 != 0:
-        q = u3 // v3
-        v1, v2, v3, u1, u2, u3 = (u1 - q * v1), (u2 - q * v2), (u3 - q * v3), v1, v2, v3
-    
-    return u1 % m
+    return AffineCipher(a, b % 26)
+
 
 def affine_cipher(text, a, b, encrypt=True):
     """
     Performs an Affine Cipher encryption or decryption on the input text.
-    
+
     Args:
         text (str): The text to be encrypted or decrypted.
         a (int): The multiplicative factor (must be coprime to 26).
         b (int): The additive factor.
         encrypt (bool): True to encrypt, False to decrypt.
-    
+
     Returns:
         str: The encrypted or decrypted text.
     """
-    result = ''
-    for char in text:
-        if char.isalpha():
-            # Shift the character by the specified amount
-            x = ord(char.upper()) - 65
-            if encrypt:
-                y = (a * x + b) % 26
-            else:
-                a_inv = mod_inverse(a, 26)
-                y = (a_inv * (x - b)) % 26
-            result += chr(y + 65)
-        else:
-            result += char
-    return result
+    return get_cipher(a, b).transform(text, encrypt)
+
+
+def affine_cipher_into(data, out, a, b, encrypt=True):
+    """
+    Performs an Affine Cipher encryption or decryption of a buffer into a caller-provided buffer (or in place).
+
+    Returns:
+        int: The number of bytes written.
+    """
+    return get_cipher(a, b).transform_into(data, out, encrypt)
+
 
-# Example usage
-plaintext = "HELLO WORLD"
-a, b = 5, 8
-ciphertext = affine_cipher(plaintext, a, b, encrypt=True)
-print("Plaintext:", plaintext)
-print("Ciphertext:", ciphertext)
-print("Decrypted text:", affine_cipher(ciphertext, a, b, encrypt=False))
+def affine_batch(data, keys, encrypt=True):
+    """
+    Applies many (a, b) keys to one buffer in a single pass.
+
+    With NumPy the per-key tables are stacked into a (len(keys), 256) matrix and gathered with the
+    input in one operation; without NumPy each key falls back to bytes.translate.
+
+    Args:
+        data (bytes-like): The data to be encrypted or decrypted.
+        keys (iterable): The (a, b) key pairs to apply.
+        encrypt (bool): True to encrypt, False to decrypt.
+
+    Returns:
+        list: One bytes result per key, in the order of keys.
+    """
+    ciphers = [get_cipher(a, b) for a, b in keys]
+    if np is None or not ciphers:
+        data = bytes(data)
+        return [data.translate(cipher.table(encrypt)) for cipher in ciphers]
+    tables = np.frombuffer(b"".join(cipher.table(encrypt) for cipher in ciphers), dtype=np.uint8)
+    tables = tables.reshape(len(ciphers), 256)
+    results = tables[:, np.frombuffer(data, dtype=np.uint8)]
+    return [row.tobytes() for row in results]
+
+
+if __name__ == "__main__":
+    # Example usage
+    plaintext = "HELLO WORLD"
+    a, b = 5, 8
+    ciphertext = affine_cipher(plaintext, a, b, encrypt=True)
+    print("Plaintext:", plaintext)
+    print("Ciphertext:", ciphertext)
+    print("Decrypted text:", affine_cipher(ciphertext, a, b, encrypt=False))
 
 
 """
 
 The key aspects of this Affine Cipher implementation are:
 
-1. The `gcd()` function computes the Greatest Common Divisor (GCD) of two integers, which is used to ensure the multiplicative factor `a` is coprime to 26.
-2. The `mod_inverse()` function calculates the modular inverse of `a` modulo 26, which is used in the decryption process.
-3. The `affine_cipher()` function performs the actual encryption and decryption, using the provided multiplicative factor `a` and additive factor `b`.
+1. `mod_inverse()` from `number_theory.py` (in the Public Key Cryptography folder) calculates the modular inverse of `a` modulo 26, which is used in the decryption process. It raises ValueError when `a` is not coprime to 26, which is how the key is validated.
+2. The `AffineCipher` class validates the key and computes the modular inverse once. Because decryption
+   `x = a_inv * (y - b)` is also an affine map, both directions become 256-entry lookup tables applied with
+   `str.translate()`/`bytes.translate()`, or with a NumPy gather for large `uint8` buffers.
+3. The `affine_cipher()` function performs the actual encryption and decryption with a cached `AffineCipher`.
+   `affine_cipher_into()` (and `AffineCipher.transform_into()`) read any buffer and write into a caller-provided one,
+   or in place, tile by tile, so nothing the size of the input is allocated.
+4. The `affine_batch()` function applies many keys to the same buffer in a single NumPy gather.
 
 In the example usage, the plaintext "HELLO WORLD" is encrypted using the Affine Cipher with `a=5` and `b=8`, and the resulting ciphertext is then decrypted.
 
-"""
\ No newline at end of file
+"""
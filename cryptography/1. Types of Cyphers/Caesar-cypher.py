@@ -1,40 +1,198 @@
+import argparse
+import io
+import sys
+from functools import lru_cache
+
+from buffers import byte_views, translate_into
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class _CaesarTable(dict):
+    """
+    Translation table for str.translate that fills itself in on first use.
+
+    ASCII letters are precomputed; any other character is resolved the first time it is seen,
+    using exactly the same rule as the original character loop, and then cached.
+    """
+
+    def __init__(self, shift):
+        super().__init__()
+        self.shift = shift
+        for code in range(128):
+            self.__missing__(code)
+
+    def __missing__(self, code):
+        char = chr(code)
+        if char.isalpha():
+            shifted = code + self.shift
+            if char.isupper():
+                value = (shifted - 65) % 26 + 65
+            else:
+                value = (shifted - 97) % 26 + 97
+        else:
+            value = code
+        self[code] = value
+        return value
+
+
+@lru_cache(maxsize=None)
+def _text_table(shift):
+    return _CaesarTable(shift)
+
+
+@lru_cache(maxsize=None)
+def _bytes_table(shift):
+    table = bytearray(range(256))
+    for base in (65, 97):
+        for i in range(26):
+            table[base + i] = base + (i + shift) % 26
+    return bytes(table)
+
+
+def caesar_table(shift, encrypt=True):
+    """
+    Returns the cached str.translate table for a shift.
+    """
+    return _text_table((shift if encrypt else -shift) % 26)
+
+
+def caesar_bytes_table(shift, encrypt=True):
+    """
+    Returns the cached 256-entry bytes.translate table for a shift (ASCII letters only).
+    """
+    return _bytes_table((shift if encrypt else -shift) % 26)
+
+
 def caesar_cipher(text, shift, encrypt=True):
     """
     Performs a Caesar cipher encryption or decryption on the input text.
-    
+
     Args:
         text (str): The text to be encrypted or decrypted.
         shift (int): The number of positions to shift the alphabet.
         encrypt (bool): True to encrypt, False to decrypt.
-    
+
     Returns:
         str: The encrypted or decrypted text.
     """
-    result = ''
-    for char in text:
-        if char.isalpha():
-            # Shift the character by the specified amount
-            shifted = ord(char) + (shift if encrypt else -shift)
-            
-            # Wrap around if the character goes beyond the alphabet
-            if char.isupper():
-                result += chr((shifted - 65) % 26 + 65)
-            else:
-                result += chr((shifted - 97) % 26 + 97)
+    return text.translate(caesar_table(shift, encrypt))
+
+
+def caesar_cipher_bytes(data, shift, encrypt=True):
+    """
+    Performs a Caesar cipher on binary data, shifting only the ASCII letters.
+
+    Args:
+        data (bytes-like): The data to be encrypted or decrypted.
+        shift (int): The number of positions to shift the alphabet.
+        encrypt (bool): True to encrypt, False to decrypt.
+
+    Returns:
+        bytes: The encrypted or decrypted data.
+    """
+    return bytes(data).translate(caesar_bytes_table(shift, encrypt))
+
+
+def caesar_cipher_into(data, out, shift, encrypt=True):
+    """
+    Performs a Caesar cipher on binary data, writing the result into a caller-provided buffer.
+
+    Nothing proportional to the input is allocated. out may be data itself, to encrypt in place.
+
+    Args:
+        data (bytes-like): The data to be encrypted or decrypted (bytes, bytearray, memoryview, mmap, ...).
+        out (bytes-like): A writable buffer of at least len(data) bytes.
+        shift (int): The number of positions to shift the alphabet.
+        encrypt (bool): True to encrypt, False to decrypt.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    source, target = byte_views(data, out)
+    translate_into(source, target, caesar_bytes_table(shift, encrypt))
+    return len(source)
+
+
+def caesar_stream(source, sink, shift, encrypt=True, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encrypts or decrypts a stream chunk by chunk, using constant memory.
+
+    Text streams go through caesar_cipher() and binary streams through caesar_cipher_bytes().
+
+    Args:
+        source: A readable file object (text or binary).
+        sink: A writable file object of the same kind as source.
+        shift (int): The number of positions to shift the alphabet.
+        encrypt (bool): True to encrypt, False to decrypt.
+        chunk_size (int): The number of characters or bytes read per chunk.
+
+    Returns:
+        int: The number of characters or bytes processed.
+    """
+    total = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, str):
+            sink.write(chunk.translate(caesar_table(shift, encrypt)))
         else:
-            result += char
-    return result
+            sink.write(chunk.translate(caesar_bytes_table(shift, encrypt)))
+        total += len(chunk)
+    sink.flush()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a file or stdin through the Caesar cipher.")
+    parser.add_argument("shift", type=int, help="number of positions to shift the alphabet")
+    parser.add_argument("input", nargs="?", help="input file (default: stdin)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("-d", "--decrypt", action="store_true", help="decrypt instead of encrypt")
+    parser.add_argument("-b", "--binary", action="store_true",
+                        help="treat the input as raw bytes and shift ASCII letters only")
+    parser.add_argument("--encoding", default="utf-8", help="text encoding (default: utf-8)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    source = open(args.input, "rb") if args.input else sys.stdin.buffer
+    sink = open(args.output, "wb") if args.output else sys.stdout.buffer
+    if not args.binary:
+        source = io.TextIOWrapper(source, encoding=args.encoding, newline="")
+        sink = io.TextIOWrapper(sink, encoding=args.encoding, newline="")
+    try:
+        caesar_stream(source, sink, args.shift, not args.decrypt, args.chunk_size)
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            sink.close()
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+
+    # Example usage
+    plaintext = "HELLO WORLD"
+    shift = 3
+    ciphertext = caesar_cipher(plaintext, shift, encrypt=True)
+    print("Plaintext:", plaintext)
+    print("Ciphertext:", ciphertext)
+    print("Decrypted text:", caesar_cipher(ciphertext, shift, encrypt=False))
+
+"""
+This implementation takes in the text to be encrypted or decrypted, the number of positions to shift the alphabet, and a boolean flag to specify whether to encrypt or decrypt.
+Instead of shifting one character at a time, it builds a translation table once per shift and caches it, so the whole
+text is converted by a single str.translate() call. Binary data uses a 256-entry bytes.translate() table that shifts
+only the ASCII letters, and caesar_cipher_into() applies the same table from any buffer into a caller-provided one (or
+in place), tile by tile, without allocating anything the size of the input.
 
-# Example usage
-plaintext = "HELLO WORLD"
-shift = 3
-ciphertext = caesar_cipher(plaintext, shift, encrypt=True)
-print("Plaintext:", plaintext)
-print("Ciphertext:", ciphertext)
-print("Decrypted text:", caesar_cipher(ciphertext, shift, encrypt=False))
+caesar_stream() and the command line interface read stdin or a file in fixed-size chunks and write each chunk as soon
+as it is translated, so memory use stays constant regardless of the input size:
 
+    python Caesar-cypher.py 3 big.log -o big.enc
+    cat big.enc | python Caesar-cypher.py 3 --decrypt > big.log
 """
-This implementation takes in the text to be encrypted or decrypted, the number of positions to shift the alphabet, and a boolean flag to specify whether to encrypt or decrypt. 
-It then loops through each character in the input text, shifts the character by the specified amount, and wraps around the alphabet if necessary. 
-The resulting encrypted or decrypted text is returned.
-"""
\ No newline at end of file
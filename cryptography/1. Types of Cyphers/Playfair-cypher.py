@@ -1,3 +1,15 @@
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from buffers import TILE_SIZE, byte_views, workspace
+
+# bytes.translate() table doing what the text path does before pairing letters: upper-casing and J -> I.
+_NORMALIZE = bytes(range(256)).upper().replace(b'J', b'I')
+
 def prepare_key(key):
     """
     Prepares the key by removing duplicates and adding 'I' in place of 'J'.
@@ -40,6 +52,121 @@ def find_in_grid(grid, char):
                 return i, j
     return None, None
 
+class PlayfairKey:
+    """
+    A prepared Playfair key: the grid, a character -> (row, col) index and a digraph table for each direction.
+
+    Each table maps every one of the 25 x 25 possible letter pairs straight to its encrypted or decrypted
+    pair, so a message is converted with one dictionary lookup per digraph and no grid scans.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.grid = generate_grid(prepare_key(key))
+        self.positions = {char: (row, col) for row, cells in enumerate(self.grid) for col, char in enumerate(cells)}
+        self.encrypt_table = self._digraph_table(1)
+        self.decrypt_table = self._digraph_table(-1)
+        self._pair_tables = {}
+
+    def _digraph_table(self, step):
+        grid = self.grid
+        table = {}
+        for first, (row1, col1) in self.positions.items():
+            for second, (row2, col2) in self.positions.items():
+                if row1 == row2:
+                    pair = grid[row1][(col1 + step) % 5] + grid[row2][(col2 + step) % 5]
+                elif col1 == col2:
+                    pair = grid[(row1 + step) % 5][col1] + grid[(row2 + step) % 5][col2]
+                else:
+                    pair = grid[row1][col2] + grid[row2][col1]
+                table[first + second] = pair
+        return table
+
+    def table(self, encrypt=True):
+        """
+        Returns the digraph table for one direction.
+        """
+        return self.encrypt_table if encrypt else self.decrypt_table
+
+    def transform(self, text, encrypt=True):
+        """
+        Encrypts or decrypts a text with this key.
+        """
+        text = text.upper().replace('J', 'I')
+        if len(text) % 2:
+            text += 'X'
+        pairs = [text[i:i+2] for i in range(0, len(text), 2)]
+        # Pairs containing a character outside the grid are passed through unchanged.
+        table = self.table(encrypt)
+        return ''.join(map(table.get, pairs, pairs))
+
+    def _pair_table(self, encrypt):
+        """
+        Returns the digraph table for raw bytes: the output pair of every one of the 65536 byte pairs, indexed by
+        first * 256 + second, as a list of 2-byte strings and (with NumPy) as a uint16 array indexed by the pair
+        read as a native uint16.
+        """
+        if encrypt not in self._pair_tables:
+            table = self.table(encrypt)
+            pairs = []
+            for first in _NORMALIZE:
+                for second in _NORMALIZE:
+                    pair = chr(first) + chr(second)
+                    pairs.append(table.get(pair, pair).encode('latin-1'))
+            array = None
+            if np is not None:
+                by_value = np.frombuffer(b''.join(pairs), dtype=np.uint16)
+                # The two bytes of every native uint16 value, whatever the byte order of the machine.
+                native = np.arange(65536, dtype=np.uint16).view(np.uint8).reshape(-1, 2).astype(np.intp)
+                array = by_value[native[:, 0] * 256 + native[:, 1]]
+            self._pair_tables[encrypt] = pairs, array
+        return self._pair_tables[encrypt]
+
+    def transform_into(self, data, out, encrypt=True):
+        """
+        Encrypts or decrypts ASCII bytes into a caller-provided buffer, exactly as transform() does for text.
+
+        Every byte pair is converted with one lookup in a 65536-entry table, and nothing proportional to the input
+        is allocated. Data of odd length is padded with 'X', so out needs len(data) + 1 bytes; for even lengths out
+        may be data itself, to work in place.
+
+        Args:
+            data (bytes-like): The data to be encrypted or decrypted (bytes, bytearray, memoryview, mmap, ...).
+            out (bytes-like): A writable buffer of at least len(data) bytes, rounded up to an even number.
+            encrypt (bool): True to encrypt, False to decrypt.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        length = len(memoryview(data).cast('B'))
+        source, target = byte_views(data, out, length + length % 2)
+        even = length - length % 2
+        pairs, array = self._pair_table(encrypt)
+        if array is not None and even:
+            values = np.frombuffer(source[:even], dtype=np.uint16)
+            result = np.frombuffer(target[:even], dtype=np.uint16)
+            for start in range(0, len(values), TILE_SIZE):
+                tile = values[start:start + TILE_SIZE]
+                index = workspace.array("playfair", len(tile), np.intp)
+                np.copyto(index, tile)
+                np.take(array, index, out=result[start:start + len(tile)], mode="wrap")
+        else:
+            for start in range(0, even, TILE_SIZE):
+                end = min(start + TILE_SIZE, even)
+                target[start:end] = b''.join(
+                    [pairs[first << 8 | second] for first, second in zip(source[start:end:2], source[start + 1:end:2])])
+        if length % 2:
+            target[even:] = pairs[source[even] << 8 | ord('X')]
+        return len(target)
+
+
+@lru_cache(maxsize=256)
+def get_playfair_key(key):
+    """
+    Returns the prepared PlayfairKey for a key, building it only the first time the key is used.
+    """
+    return PlayfairKey(key)
+
 def playfair_cipher(text, key, encrypt=True):
     """
     Performs Playfair Cipher encryption or decryption on the input text.
@@ -52,38 +179,40 @@ def playfair_cipher(text, key, encrypt=True):
     Returns:
         str: The encrypted or decrypted text.
     """
-    result = ''
-    grid = generate_grid(prepare_key(key))
-    text = text.upper().replace('J', 'I')
-    pairs = [text[i:i+2] for i in range(0, len(text), 2)]
-    for pair in pairs:
-        if len(pair) < 2:
-            pair += 'X'
-        row1, col1 = find_in_grid(grid, pair[0])
-        row2, col2 = find_in_grid(grid, pair[1])
-        if row1 is None or col1 is None or row2 is None or col2 is None:
-            result += pair
-        elif row1 == row2:
-            if encrypt:
-                result += grid[row1][(col1 + 1) % 5] + grid[row2][(col2 + 1) % 5]
-            else:
-                result += grid[row1][(col1 - 1) % 5] + grid[row2][(col2 - 1) % 5]
-        elif col1 == col2:
-            if encrypt:
-                result += grid[(row1 + 1) % 5][col1] + grid[(row2 + 1) % 5][col2]
-            else:
-                result += grid[(row1 - 1) % 5][col1] + grid[(row2 - 1) % 5][col2]
-        else:
-            result += grid[row1][col2] + grid[row2][col1]
-    return result
+    return get_playfair_key(key).transform(text, encrypt)
+
+def playfair_cipher_into(data, out, key, encrypt=True):
+    """
+    Performs Playfair Cipher encryption or decryption of ASCII bytes into a caller-provided buffer.
+
+    Returns:
+        int: The number of bytes written, len(data) rounded up to an even number.
+    """
+    return get_playfair_key(key).transform_into(data, out, encrypt)
+
+def playfair_cipher_many(messages, key, encrypt=True):
+    """
+    Performs Playfair Cipher encryption or decryption on a batch of messages that share one key.
+
+    Args:
+        messages (iterable): The texts to be encrypted or decrypted.
+        key (str): The key for the Playfair Cipher.
+        encrypt (bool): True to encrypt, False to decrypt.
+
+    Returns:
+        list: The encrypted or decrypted texts, in the order of messages.
+    """
+    prepared = get_playfair_key(key)
+    return [prepared.transform(text, encrypt) for text in messages]
 
-# Example usage
-plaintext = "HELLO WORLD"
-key = "PLAYFAIREXAMPLE"
-ciphertext = playfair_cipher(plaintext, key, encrypt=True)
-print("Plaintext:", plaintext)
-print("Ciphertext:", ciphertext)
-print("Decrypted text:", playfair_cipher(ciphertext, key, encrypt=False))
+if __name__ == "__main__":
+    # Example usage
+    plaintext = "HELLO WORLD"
+    key = "PLAYFAIREXAMPLE"
+    ciphertext = playfair_cipher(plaintext, key, encrypt=True)
+    print("Plaintext:", plaintext)
+    print("Ciphertext:", ciphertext)
+    print("Decrypted text:", playfair_cipher(ciphertext, key, encrypt=False))
 
 
 """
@@ -92,7 +221,13 @@ The key aspects of this Playfair Cipher implementation are:
 1. The `prepare_key()` function removes duplicates from the key and replaces 'J' with 'I'.
 2. The `generate_grid()` function creates the 5x5 Playfair grid from the prepared key.
 3. The `find_in_grid()` function locates the row and column of a character in the Playfair grid.
-4. The `playfair_cipher()` function performs the actual encryption and decryption, following the Playfair Cipher rules.
+4. The `PlayfairKey` class indexes every grid character by (row, col) and precomputes the result of the Playfair
+   rules for all 625 digraphs in each direction. `get_playfair_key()` keeps prepared keys in an LRU cache.
+5. The `playfair_cipher()` function performs the actual encryption and decryption with one table lookup per digraph,
+   and `playfair_cipher_many()` converts a batch of messages under the same key.
+6. `playfair_cipher_into()` converts ASCII bytes from any buffer into a caller-provided one (or in place). The
+   digraph table is extended to all 65536 byte pairs, so with NumPy each pair is one uint16 gather into reused
+   scratch arrays, and nothing the size of the input is allocated.
 
 In the example usage, the plaintext "HELLO WORLD" is encrypted using the Playfair Cipher with the key "PLAYFAIREXAMPLE", and the resulting ciphertext is then decrypted.
 
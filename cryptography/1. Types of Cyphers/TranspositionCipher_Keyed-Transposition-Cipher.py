@@ -1,3 +1,17 @@
+import argparse
+import io
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from buffers import byte_views, overlaps
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+
 def prepare_key(key):
     """
     Prepares the key by removing duplicates and sorting the characters.
@@ -5,86 +19,221 @@ def prepare_key(key):
     key = ''.join(sorted(set(key.upper())))
     return key
 
+
+def column_order(key):
+    """
+    Turns the key into the order in which the grid columns are read, computed once per key.
+
+    Column i belongs to the i-th distinct character of the key, in the order the characters first appear, and the
+    columns are read in the alphabetical order of their characters: "SECURITY" has the columns S E C U R I T Y and
+    is read C, E, I, R, S, T, U, Y, i.e. columns (2, 1, 5, 4, 0, 6, 3, 7).
+    """
+    columns = ''.join(dict.fromkeys(key.upper()))
+    if not columns:
+        raise ValueError("The key must contain at least one character.")
+    return tuple(columns.index(char) for char in prepare_key(key))
+
+
+def _column_lengths(length, columns):
+    rows, extra = divmod(length, columns)
+    return [rows + (col < extra) for col in range(columns)]
+
+
+def transpose(data, order, encrypt=True):
+    """
+    Writes data into a grid row-wise and reads it out column by column in the given order (or the reverse).
+
+    Each column is one slice (data[col::columns]), so there is no per-cell Python work. Binary data that fills
+    the grid exactly is reshaped and transposed with NumPy instead, when it is available.
+
+    Args:
+        data (str or bytes-like): The text or data to be encrypted or decrypted.
+        order (tuple): The column order, as returned by column_order().
+        encrypt (bool): True to encrypt, False to decrypt.
+
+    Returns:
+        str or bytes: The encrypted or decrypted text or data.
+    """
+    columns = len(order)
+    length = len(data)
+    if not isinstance(data, str):
+        if np is not None and length and length % columns == 0:
+            array = np.frombuffer(data, dtype=np.uint8)
+            if encrypt:
+                return array.reshape(-1, columns)[:, list(order)].T.tobytes()
+            result = np.empty((length // columns, columns), dtype=np.uint8)
+            result[:, list(order)] = array.reshape(columns, -1).T
+            return result.tobytes()
+        data = bytes(data)
+    if encrypt:
+        return data[:0].join(data[col::columns] for col in order)
+    lengths = _column_lengths(length, columns)
+    result = [''] * length if isinstance(data, str) else bytearray(length)
+    start = 0
+    for col in order:
+        result[col::columns] = data[start:start + lengths[col]]
+        start += lengths[col]
+    return ''.join(result) if isinstance(data, str) else bytes(result)
+
+
+def transpose_into(data, out, order, encrypt=True):
+    """
+    Transposes any buffer into a caller-provided one, as transpose() does, without allocating anything.
+
+    Every column is copied with one strided slice assignment, straight from data into out (through NumPy views
+    when available, which copy strided bytes several times as fast as memoryviews). A transposition moves
+    every byte, so out must not overlap data.
+
+    Args:
+        data (bytes-like): The data to be encrypted or decrypted (bytes, bytearray, memoryview, mmap, ...).
+        out (bytes-like): A writable buffer of at least len(data) bytes.
+        order (tuple): The column order, as returned by column_order().
+        encrypt (bool): True to encrypt, False to decrypt.
+
+    Returns:
+        int: The number of bytes written.
+
+    Raises:
+        ValueError: If out overlaps data.
+    """
+    source, target = byte_views(data, out)
+    if overlaps(source, target):
+        raise ValueError("A transposition cannot work in place: out must not overlap data.")
+    columns = len(order)
+    lengths = _column_lengths(len(source), columns)
+    if np is not None:
+        source = np.frombuffer(source, dtype=np.uint8)
+        target = np.frombuffer(target, dtype=np.uint8)
+    start = 0
+    for col in order:
+        if encrypt:
+            target[start:start + lengths[col]] = source[col::columns]
+        else:
+            target[col::columns] = source[start:start + lengths[col]]
+        start += lengths[col]
+    return len(source)
+
+
 def keyed_transposition_cipher(text, key, encrypt=True):
     """
     Performs Keyed Transposition Cipher encryption or decryption on the input text.
-    
+
     Args:
         text (str): The text to be encrypted or decrypted.
         key (str): The key for the Keyed Transposition Cipher.
         encrypt (bool): True to encrypt, False to decrypt.
-    
+
     Returns:
         str: The encrypted or decrypted text.
     """
-    result = ''
-    key = prepare_key(key)
-    text_length = len(text)
-    columns = len(key)
-    rows = text_length // columns + (text_length % columns > 0)
-    grid = [['' for _ in range(columns)] for _ in range(rows)]
+    return transpose(text, column_order(key), encrypt)
 
-    if encrypt:
-        # Fill the grid row-wise
-        idx = 0
-        for row in range(rows):
-            for col in range(columns):
-                if idx < text_length:
-                    grid[row][col] = text[idx]
-                    idx += 1
-
-        # Read the grid based on the key
-        for char in key:
-            col = key.index(char)
-            for row in range(rows):
-                if grid[row][col]:
-                    result += grid[row][col]
-    else:
-        # Fill the grid based on the key
-        idx = 0
-        for char in key:
-            col = key.index(char)
-            for row in range(rows):
-                if idx < text_length:
-                    grid[row][col] = text[idx]
-                    idx += 1
-
-        # Read the grid row-wise
-        for row in range(rows):
-            for col in range(columns):
-                if grid[row][col]:
-                    result += grid[row][col]
-
-    return result
-
-# Example usage
-plaintext = "HELLO WORLD"
-key = "SECURITY"
-ciphertext = keyed_transposition_cipher(plaintext, key, encrypt=True)
-print("Plaintext:", plaintext)
-print("Ciphertext:", ciphertext)
-print("Decrypted text:", keyed_transposition_cipher(ciphertext, key, encrypt=False))
+
+def keyed_transposition_cipher_into(data, out, key, encrypt=True):
+    """
+    Performs Keyed Transposition Cipher encryption or decryption of a buffer into a separate caller-provided buffer.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    return transpose_into(data, out, column_order(key), encrypt)
+
+
+def keyed_transposition_stream(source, sink, key, encrypt=True, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Encrypts or decrypts a stream as a sequence of independently transposed fixed-size blocks.
+
+    Only one block is held in memory at a time. The block size is rounded down to a multiple of the number of
+    columns so that every full block fills its grid exactly. The same block size must be used to decrypt.
+
+    Args:
+        source: A readable file object (text or binary).
+        sink: A writable file object of the same kind as source.
+        key (str): The key for the Keyed Transposition Cipher.
+        encrypt (bool): True to encrypt, False to decrypt.
+        block_size (int): The number of characters or bytes per block.
+
+    Returns:
+        int: The number of characters or bytes processed.
+    """
+    order = column_order(key)
+    block_size = max(block_size - block_size % len(order), len(order))
+    total = 0
+    while True:
+        block = source.read(block_size)
+        if not block:
+            break
+        sink.write(transpose(block, order, encrypt))
+        total += len(block)
+    sink.flush()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a file or stdin through the Keyed Transposition Cipher "
+                                                 "in fixed-size blocks.")
+    parser.add_argument("key", help="the transposition key")
+    parser.add_argument("input", nargs="?", help="input file (default: stdin)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("-d", "--decrypt", action="store_true", help="decrypt instead of encrypt")
+    parser.add_argument("-b", "--binary", action="store_true", help="transpose raw bytes instead of characters")
+    parser.add_argument("--encoding", default="utf-8", help="text encoding (default: utf-8)")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    args = parser.parse_args(argv)
+
+    source = open(args.input, "rb") if args.input else sys.stdin.buffer
+    sink = open(args.output, "wb") if args.output else sys.stdout.buffer
+    if not args.binary:
+        source = io.TextIOWrapper(source, encoding=args.encoding, newline="")
+        sink = io.TextIOWrapper(sink, encoding=args.encoding, newline="")
+    try:
+        keyed_transposition_stream(source, sink, args.key, not args.decrypt, args.block_size)
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            sink.close()
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+
+    # Example usage
+    plaintext = "HELLO WORLD"
+    key = "SECURITY"
+    ciphertext = keyed_transposition_cipher(plaintext, key, encrypt=True)
+    print("Plaintext:", plaintext)
+    print("Ciphertext:", ciphertext)
+    print("Decrypted text:", keyed_transposition_cipher(ciphertext, key, encrypt=False))
 
 """
 The key aspects of this Keyed Transposition Cipher implementation are:
 
-1. The prepare_key() function removes duplicates from the key and sorts the characters.
-2. The keyed_transposition_cipher() function performs both encryption and decryption.
+1. The prepare_key() function removes duplicates from the key and sorts the characters, and column_order() turns
+    the key into a column permutation once per key: every distinct key character owns one column, in the order the
+    characters appear in the key, and the columns are read in the sorted order given by prepare_key().
+2. The transpose() function performs both encryption and decryption without building the grid.
 3. For encryption:
-    The input text is arranged in a rectangular grid, row-wise.
-    The grid is then read based on the order of the characters in the prepared key.
+    The input text is arranged in a rectangular grid, row-wise, so column c holds text[c::columns].
+    The ciphertext is these column slices concatenated in the order given by the key.
 4. For decryption:
-    The ciphertext is arranged in a rectangular grid based on the order of the characters in the prepared key.
-    The grid is then read row-wise to generate the plaintext.
-    
-The size of the rectangular grid is determined by the length of the input text and the length of the prepared key. 
-The number of rows is calculated as the integer division of the text length by the key length, plus an additional 
+    The ciphertext is cut into column slices of the right lengths (the first len(text) % columns columns are one
+    character longer when the last row is not full) and each slice is assigned back into result[c::columns].
+5. Binary data that fills the grid exactly is transposed by NumPy as a reshape, a column selection and a transpose.
+    transpose_into() and keyed_transposition_cipher_into() read any buffer and copy each column slice straight into
+    a caller-provided buffer, so nothing at all is allocated. Since every byte moves, they cannot work in place.
+6. keyed_transposition_stream() and the command line interface encrypt arbitrarily large inputs as a stream of
+    fixed-size blocks, each transposed on its own, so memory stays bounded:
+
+        python TranspositionCipher_Keyed-Transposition-Cipher.py SECURITY big.txt -o big.enc
+
+The size of the rectangular grid is determined by the length of the input text and the length of the prepared key.
+The number of rows is calculated as the integer division of the text length by the key length, plus an additional
 row if there are any remaining characters.
 
-In the example usage, the plaintext "HELLO WORLD" is encrypted using the Keyed Transposition Cipher with the key 
+In the example usage, the plaintext "HELLO WORLD" is encrypted using the Keyed Transposition Cipher with the key
 "SECURITY", and the resulting ciphertext is then decrypted.
 
-This implementation assumes that the input text contains only alphanumeric characters and spaces. 
-If you need to handle other types of characters, you may need to modify the code accordingly.
-
-"""
\ No newline at end of file
+"""
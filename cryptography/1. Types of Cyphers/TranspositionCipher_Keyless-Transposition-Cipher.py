@@ -1,76 +1,202 @@
+import argparse
+import io
+import math
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from buffers import byte_views, overlaps
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+
+def grid_shape(length):
+    """
+    Returns the (rows, columns) of the grid used for a text of the given length.
+
+    The number of columns is the integer square root of the length, and there are as many rows as are needed to
+    hold every character.
+    """
+    columns = max(1, math.isqrt(length))
+    return -(-length // columns), columns
+
+
 def keyless_transposition_cipher(text, encrypt=True):
     """
     Performs Keyless Transposition Cipher encryption or decryption on the input text.
-    
+
     Args:
-        text (str): The text to be encrypted or decrypted.
+        text (str or bytes-like): The text or data to be encrypted or decrypted.
         encrypt (bool): True to encrypt, False to decrypt.
-    
+
     Returns:
-        str: The encrypted or decrypted text.
+        str or bytes: The encrypted or decrypted text or data.
     """
-    result = ''
-    text_length = len(text)
-    columns = int(text_length ** 0.5)
-    rows = columns if text_length % columns == 0 else columns + 1
-    grid = [['' for _ in range(columns)] for _ in range(rows)]
-
+    length = len(text)
+    rows, columns = grid_shape(length)
+    if not isinstance(text, str):
+        if np is not None and length and rows * columns == length:
+            array = np.frombuffer(text, dtype=np.uint8)
+            shape = (rows, columns) if encrypt else (columns, rows)
+            return array.reshape(shape).T.tobytes()
+        text = bytes(text)
     if encrypt:
-        # Fill the grid row-wise
-        idx = 0
-        for row in range(rows):
-            for col in range(columns):
-                if idx < text_length:
-                    grid[row][col] = text[idx]
-                    idx += 1
-
-        # Read the grid column-wise
-        for col in range(columns):
-            for row in range(rows):
-                if grid[row][col]:
-                    result += grid[row][col]
-    else:
-        # Fill the grid column-wise
-        idx = 0
-        for col in range(columns):
-            for row in range(rows):
-                if idx < text_length:
-                    grid[row][col] = text[idx]
-                    idx += 1
-
-        # Read the grid row-wise
-        for row in range(rows):
-            for col in range(columns):
-                if grid[row][col]:
-                    result += grid[row][col]
-
-    return result
-
-# Example usage
-plaintext = "HELLO WORLD"
-ciphertext = keyless_transposition_cipher(plaintext, encrypt=True)
-print("Plaintext:", plaintext)
-print("Ciphertext:", ciphertext)
-print("Decrypted text:", keyless_transposition_cipher(ciphertext, encrypt=False))
+        # Column c of the row-wise grid is text[c::columns].
+        return text[:0].join(text[col::columns] for col in range(columns))
+    # The first length % columns columns are one character longer when the last row is not full.
+    full, extra = divmod(length, columns)
+    result = [''] * length if isinstance(text, str) else bytearray(length)
+    start = 0
+    for col in range(columns):
+        end = start + full + (col < extra)
+        result[col::columns] = text[start:end]
+        start = end
+    return ''.join(result) if isinstance(text, str) else bytes(result)
+
+
+def keyless_transposition_cipher_into(data, out, encrypt=True):
+    """
+    Performs Keyless Transposition Cipher encryption or decryption of a buffer into a separate caller-provided
+    buffer, without allocating anything: a full grid is copied transposed in one NumPy assignment, any other grid
+    with one strided slice assignment per column.
+
+    Args:
+        data (bytes-like): The data to be encrypted or decrypted (bytes, bytearray, memoryview, mmap, ...).
+        out (bytes-like): A writable buffer of at least len(data) bytes; it must not overlap data.
+        encrypt (bool): True to encrypt, False to decrypt.
+
+    Returns:
+        int: The number of bytes written.
+
+    Raises:
+        ValueError: If out overlaps data.
+    """
+    source, target = byte_views(data, out)
+    if overlaps(source, target):
+        raise ValueError("A transposition cannot work in place: out must not overlap data.")
+    length = len(source)
+    rows, columns = grid_shape(length)
+    full, extra = divmod(length, columns)
+    if np is not None:
+        source = np.frombuffer(source, dtype=np.uint8)
+        target = np.frombuffer(target, dtype=np.uint8)
+        if length and rows * columns == length:
+            # A full grid is one transposed copy, much faster than a slice per column when there are many columns.
+            shape = (rows, columns) if encrypt else (columns, rows)
+            target.reshape(shape[::-1])[...] = source.reshape(shape).T
+            return length
+    start = 0
+    for col in range(columns):
+        end = start + full + (col < extra)
+        if encrypt:
+            target[start:end] = source[col::columns]
+        else:
+            target[col::columns] = source[start:end]
+        start = end
+    return length
+
+
+def keyless_transposition_blocks(source, encrypt=True, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Yields the encryption or decryption of a stream, one independently transposed block at a time.
+
+    Every block of block_size characters or bytes gets its own grid, so only one block is held in memory.
+    The same block size must be used to decrypt.
+
+    Args:
+        source: A readable file object (text or binary).
+        encrypt (bool): True to encrypt, False to decrypt.
+        block_size (int): The number of characters or bytes per block.
+
+    Yields:
+        str or bytes: The transposed blocks, in order.
+    """
+    if block_size < 1:
+        raise ValueError("The block size must be positive.")
+    while True:
+        block = source.read(block_size)
+        if not block:
+            break
+        yield keyless_transposition_cipher(block, encrypt)
+
+
+def keyless_transposition_stream(source, sink, encrypt=True, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Encrypts or decrypts a stream in fixed-size blocks and writes the result to sink.
+
+    Returns:
+        int: The number of characters or bytes processed.
+    """
+    total = 0
+    for block in keyless_transposition_blocks(source, encrypt, block_size):
+        sink.write(block)
+        total += len(block)
+    sink.flush()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a file or stdin through the Keyless Transposition Cipher "
+                                                 "in fixed-size blocks.")
+    parser.add_argument("input", nargs="?", help="input file (default: stdin)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("-d", "--decrypt", action="store_true", help="decrypt instead of encrypt")
+    parser.add_argument("-b", "--binary", action="store_true", help="transpose raw bytes instead of characters")
+    parser.add_argument("--encoding", default="utf-8", help="text encoding (default: utf-8)")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    args = parser.parse_args(argv)
+
+    source = open(args.input, "rb") if args.input else sys.stdin.buffer
+    sink = open(args.output, "wb") if args.output else sys.stdout.buffer
+    if not args.binary:
+        source = io.TextIOWrapper(source, encoding=args.encoding, newline="")
+        sink = io.TextIOWrapper(sink, encoding=args.encoding, newline="")
+    try:
+        keyless_transposition_stream(source, sink, not args.decrypt, args.block_size)
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            sink.close()
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+
+    # Example usage
+    plaintext = "HELLO WORLD"
+    ciphertext = keyless_transposition_cipher(plaintext, encrypt=True)
+    print("Plaintext:", plaintext)
+    print("Ciphertext:", ciphertext)
+    print("Decrypted text:", keyless_transposition_cipher(ciphertext, encrypt=False))
 
 """
 The key aspects of this Keyless Transposition Cipher implementation are:
 
-1. The keyless_transposition_cipher() function performs both encryption and decryption.
+1. The keyless_transposition_cipher() function performs both encryption and decryption without building the grid.
 2. For encryption:
-    - The input text is arranged in a rectangular grid, row-wise.
-    - The grid is then read column-wise to generate the ciphertext.
+    - The input text is arranged in a rectangular grid, row-wise, so column c holds text[c::columns].
+    - The grid is then read column-wise, i.e. these column slices are concatenated, to generate the ciphertext.
 3. For decryption:
-    - The ciphertext is arranged in a rectangular grid, column-wise.
-    - The grid is then read row-wise to generate the plaintext.
+    - The ciphertext is cut into column slices; when the last row is not full, the first len(text) % columns columns
+        are one character longer.
+    - Each slice is assigned back into result[c::columns], which reads the grid row-wise.
+4. Binary data that fills its grid exactly is transposed by NumPy as a reshape and a transpose.
+    keyless_transposition_cipher_into() reads any buffer and copies the grid (or each column slice) straight into a
+    caller-provided buffer, so nothing at all is allocated. Since every byte moves, it cannot work in place.
+5. keyless_transposition_blocks() and keyless_transposition_stream() split large inputs into fixed-size blocks that
+    are transposed independently, so memory stays bounded and the blocks can be processed in parallel (see
+    keyless_block_cipher.py). The default block of 1 MiB is a perfect square, a 1024x1024 grid.
 
-The size of the rectangular grid is determined by the square root of the length of the input text. If the length is 
-not a perfect square, an additional row is added to accommodate the remaining characters.
+The size of the rectangular grid is determined by the square root of the length of the input text: grid_shape() uses
+the integer square root as the number of columns and adds as many rows as are needed for the remaining characters.
 
-In the example usage, the plaintext "HELLO WORLD" is encrypted using the Keyless Transposition Cipher, and the 
+In the example usage, the plaintext "HELLO WORLD" is encrypted using the Keyless Transposition Cipher, and the
 resulting ciphertext is then decrypted.
 
-This implementation assumes that the input text contains only alphanumeric characters and spaces. 
-If you need to handle other types of characters, you may need to modify the code accordingly.
-
-"""
\ No newline at end of file
+"""
@@ -1,63 +1,268 @@
-def prepare_key(key, text_length):
+import argparse
+import io
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from buffers import TILE_SIZE, byte_views, workspace
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def _shift_table(shift):
+    """
+    Returns a 256-entry bytes.translate table that upper-cases ASCII letters and shifts them.
+    """
+    table = bytearray(range(256))
+    for i in range(26):
+        table[65 + i] = table[97 + i] = (i + shift) % 26 + 65
+    return bytes(table)
+
+
+_SHIFT_TABLES = [_shift_table(shift) for shift in range(26)]
+_FLAT_TABLE = np.frombuffer(b"".join(_SHIFT_TABLES), dtype=np.uint8) if np is not None else None
+
+
+class VigenereStream:
     """
-    Prepares the key by repeating it to match the length of the text.
+    Encrypts or decrypts a text piece by piece, carrying the key position across chunks.
+
+    Only the key itself is stored, never a key as long as the text, so memory stays proportional to
+    the chunk size. Feeding a text through update() in any number of chunks gives the same result as
+    vigenere_cipher() on the whole text.
     """
-    key = key.upper()
-    return (key * (text_length // len(key)) + key[:text_length % len(key)])
+
+    def __init__(self, key, encrypt=True, offset=0):
+        key = key.upper()
+        if not key:
+            raise ValueError("The key must not be empty.")
+        sign = 1 if encrypt else -1
+        self.shifts = [sign * (ord(char) - 65) % 26 for char in key]
+        self.offset = offset % len(key)
+        self._key_array = None
+        self._key_index = None
+
+    def update(self, chunk):
+        """
+        Encrypts or decrypts the next chunk of the input.
+
+        Args:
+            chunk (str or bytes-like): The next piece of text or data. In bytes every byte is one key
+                position; in text every character is.
+
+        Returns:
+            str or bytes: The encrypted or decrypted chunk.
+        """
+        if isinstance(chunk, str):
+            if chunk.isascii():
+                return self._update_bytes(chunk.encode("ascii")).decode("ascii")
+            return self._update_text(chunk)
+        return self._update_bytes(chunk)
+
+    def update_into(self, data, out):
+        """
+        Encrypts or decrypts the next chunk of binary input into a caller-provided buffer.
+
+        Nothing proportional to the chunk is allocated, and out may be data itself, to work in place. Mixing
+        update() and update_into() on one stream is fine: both advance the same key position.
+
+        Args:
+            data (bytes-like): The next piece of data (bytes, bytearray, memoryview, mmap, ...).
+            out (bytes-like): A writable buffer of at least len(data) bytes.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        source, target = byte_views(data, out)
+        period = len(self.shifts)
+        if np is None:
+            for start in range(0, len(source), TILE_SIZE):
+                end = min(start + TILE_SIZE, len(source))
+                offset = self._advance(end - start)
+                for first in range(min(period, end - start)):
+                    shift = self.shifts[(offset + first) % period]
+                    target[start + first:end:period] = bytes(source[start + first:end:period]).translate(
+                        _SHIFT_TABLES[shift])
+            return len(source)
+        if self._key_index is None:
+            # The same row offsets as _key_array, as platform integers so np.take() can use them without a cast.
+            self._key_index = np.tile(np.array(self.shifts, dtype=np.intp) * 256, TILE_SIZE // period + 2)
+        array = np.frombuffer(source, dtype=np.uint8)
+        result = np.frombuffer(target, dtype=np.uint8)
+        for start in range(0, len(array), TILE_SIZE):
+            tile = array[start:start + TILE_SIZE]
+            offset = self._advance(len(tile))
+            index = workspace.array("vigenere", len(tile), np.intp)
+            # Casting the tile first keeps the addition free of temporary cast buffers.
+            np.copyto(index, tile)
+            np.add(index, self._key_index[offset:offset + len(tile)], out=index)
+            np.take(_FLAT_TABLE, index, out=result[start:start + len(tile)], mode="wrap")
+        return len(source)
+
+    def _advance(self, length):
+        offset = self.offset
+        self.offset = (offset + length) % len(self.shifts)
+        return offset
+
+    def _update_text(self, text):
+        shifts = self.shifts
+        period = len(shifts)
+        offset = self._advance(len(text))
+        result = []
+        for i, char in enumerate(text):
+            if char.isalpha():
+                result.append(chr((ord(char.upper()) - 65 + shifts[(offset + i) % period]) % 26 + 65))
+            else:
+                result.append(char)
+        return "".join(result)
+
+    def _update_bytes(self, data):
+        if np is not None:
+            return self._update_array(np.frombuffer(data, dtype=np.uint8)).tobytes()
+        data = bytes(data)
+        shifts = self.shifts
+        period = len(shifts)
+        offset = self._advance(len(data))
+        result = bytearray(len(data))
+        # Every period-th byte uses the same key letter, so each strided slice is one translate().
+        for start in range(min(period, len(data))):
+            shift = shifts[(offset + start) % period]
+            result[start::period] = data[start::period].translate(_SHIFT_TABLES[shift])
+        return bytes(result)
+
+    def _update_array(self, array):
+        length = len(array)
+        period = len(self.shifts)
+        if self._key_array is None or len(self._key_array) < length + period:
+            # Row offsets into the 26 stacked shift tables, repeated to cover one chunk.
+            repeats = (length + period) // period + 1
+            self._key_array = np.tile(np.array(self.shifts, dtype=np.uint16) * 256, repeats)
+        offset = self._advance(length)
+        index = self._key_array[offset:offset + length] + array
+        return np.take(_FLAT_TABLE, index)
+
 
 def vigenere_cipher(text, key, encrypt=True):
     """
     Performs Vigenère Cipher encryption or decryption on the input text.
-    
+
     Args:
         text (str): The text to be encrypted or decrypted.
         key (str): The key for the Vigenère Cipher.
         encrypt (bool): True to encrypt, False to decrypt.
-    
+
     Returns:
         str: The encrypted or decrypted text.
     """
-    result = ''
-    key = prepare_key(key, len(text))
-    for i, char in enumerate(text):
-        if char.isalpha():
-            row = ord(char.upper()) - 65
-            col = ord(key[i]) - 65
-            if encrypt:
-                result += chr((row + col) % 26 + 65)
-            else:
-                result += chr((row - col) % 26 + 65)
-        else:
-            result += char
-    return result
-
-# Example usage
-plaintext = "HELLO WORLD"
-key = "LEMON"
-ciphertext = vigenere_cipher(plaintext, key, encrypt=True)
-print("Plaintext:", plaintext)
-print("Ciphertext:", ciphertext)
-print("Decrypted text:", vigenere_cipher(ciphertext, key, encrypt=False))
+    return VigenereStream(key, encrypt).update(text)
+
+
+def vigenere_cipher_into(data, out, key, encrypt=True):
+    """
+    Performs Vigenère Cipher encryption or decryption of a buffer into a caller-provided buffer (or in place).
+
+    Returns:
+        int: The number of bytes written.
+    """
+    return VigenereStream(key, encrypt).update_into(data, out)
+
+
+def vigenere_stream(source, sink, key, encrypt=True, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encrypts or decrypts a text or binary stream chunk by chunk.
+
+    Args:
+        source: A readable file object (text or binary).
+        sink: A writable file object of the same kind as source.
+        key (str): The key for the Vigenère Cipher.
+        encrypt (bool): True to encrypt, False to decrypt.
+        chunk_size (int): The number of characters or bytes read per chunk.
+
+    Returns:
+        int: The number of characters or bytes processed.
+    """
+    stream = VigenereStream(key, encrypt)
+    total = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        sink.write(stream.update(chunk))
+        total += len(chunk)
+    sink.flush()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a file or stdin through the Vigenère cipher.")
+    parser.add_argument("key", help="the Vigenère key")
+    parser.add_argument("input", nargs="?", help="input file (default: stdin)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("-d", "--decrypt", action="store_true", help="decrypt instead of encrypt")
+    parser.add_argument("-b", "--binary", action="store_true",
+                        help="treat the input as raw bytes; every byte advances the key")
+    parser.add_argument("--encoding", default="utf-8", help="text encoding (default: utf-8)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    source = open(args.input, "rb") if args.input else sys.stdin.buffer
+    sink = open(args.output, "wb") if args.output else sys.stdout.buffer
+    if not args.binary:
+        source = io.TextIOWrapper(source, encoding=args.encoding, newline="")
+        sink = io.TextIOWrapper(sink, encoding=args.encoding, newline="")
+    try:
+        vigenere_stream(source, sink, args.key, not args.decrypt, args.chunk_size)
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            sink.close()
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+
+    # Example usage
+    plaintext = "HELLO WORLD"
+    key = "LEMON"
+    ciphertext = vigenere_cipher(plaintext, key, encrypt=True)
+    print("Plaintext:", plaintext)
+    print("Ciphertext:", ciphertext)
+    print("Decrypted text:", vigenere_cipher(ciphertext, key, encrypt=False))
 
 """
 The key aspects of this Vigenère Cipher implementation using the Keyword method are:
 
-1. The prepare_key() function takes the key and the length of the plaintext, and generates a new key that matches the 
-    length of the plaintext by repeating the key as necessary.
+1. The VigenereStream class turns the key into a list of shifts once and remembers the position in the key between
+    calls, so the text can be processed in chunks without ever repeating the key to the length of the text.
 2. The vigenere_cipher() function performs the actual encryption and decryption.
-    - For each character in the input text, it finds the corresponding row and column in the "virtual" Vigenère table 
+    - For each character in the input text, it finds the corresponding row and column in the "virtual" Vigenère table
         based on the current key character and the input character.
     - For encryption, it uses the value at the intersection of the row and column as the encrypted character.
-    - For decryption, it subtracts the column value from the row value and takes the modulo 26 to get the decrypted 
+    - For decryption, it subtracts the column value from the row value and takes the modulo 26 to get the decrypted
         character.
-    - The key index is incremented after each character is processed, wrapping around to the beginning of the key 
+    - The key index is incremented after each character is processed, wrapping around to the beginning of the key
         if necessary.
-        
-In the example usage, the plaintext "HELLO WORLD" is encrypted using the Vigenère Cipher with the key "LEMON", and the 
+3. ASCII input is processed as bytes. With NumPy the modular addition of key and text is precomputed as 26 stacked
+    256-entry tables, so a chunk is shifted by adding the repeated key (as table offsets) to the data and doing one
+    vectorized gather. Without NumPy every key position becomes one strided bytes.translate() call.
+    VigenereStream.update_into() does the same from any buffer into a caller-provided one (or in place), one tile at
+    a time through reused scratch arrays, so it allocates nothing the size of the chunk.
+4. vigenere_stream() and the command line interface read stdin or a file in fixed-size chunks, so memory stays
+    O(chunk) however large the input is:
+
+        python VigenereCipher_Keyword-Method.py LEMON big.txt -o big.enc
+
+In the example usage, the plaintext "HELLO WORLD" is encrypted using the Vigenère Cipher with the key "LEMON", and the
 resulting ciphertext is then decrypted.
 
-The main difference between this implementation and the "Vigenère Table Method" is that this one doesn't use the Vigenère table 
-directly, but instead calculates the encrypted/decrypted character by using the row and column values based on the input character 
+The main difference between this implementation and the "Vigenère Table Method" is that this one doesn't use the Vigenère table
+directly, but instead calculates the encrypted/decrypted character by using the row and column values based on the input character
 and the key character.
 
-"""
\ No newline at end of file
+"""
@@ -1,3 +1,11 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from buffers import TILE_SIZE, byte_views, workspace
+
+
 def vigenere_table():
     """
     Generates the Vigenère table.
@@ -8,57 +16,219 @@ def vigenere_table():
             table[i].append(chr((i + j) % 26 + 65))
     return table
 
+
+def inverse_vigenere_table(table):
+    """
+    Generates the inverse of a Vigenère table: for each row, a mapping from ciphertext letter to plaintext letter.
+    """
+    return [{char: table[0][col] for col, char in enumerate(row)} for row in table]
+
+
+# Built once at import time and shared by every call.
+VIGENERE_TABLE = vigenere_table()
+INVERSE_TABLE = inverse_vigenere_table(VIGENERE_TABLE)
+
+# The same tables, flattened to key row * 26 + letter -> character code, for the byte and NumPy gather paths.
+_FORWARD_BYTES = bytes(ord(char) for row in VIGENERE_TABLE for char in row)
+_INVERSE_BYTES = bytes(ord(inverse[chr(col + 65)]) for inverse in INVERSE_TABLE for col in range(26))
+if np is not None:
+    _FORWARD_ARRAY = np.frombuffer(_FORWARD_BYTES, dtype=np.uint8)
+    _INVERSE_ARRAY = np.frombuffer(_INVERSE_BYTES, dtype=np.uint8)
+
+
+def _key_rows(key):
+    """
+    Returns the table row index of each key character, or None if the key is not all ASCII letters.
+    """
+    rows = [ord(char) - 65 for char in key.upper()[:len(key)]]
+    if rows and all(0 <= row < 26 for row in rows):
+        return rows
+    return None
+
+
+def _transform_array(text, rows, key_idx, encrypt):
+    data = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    upper = data & 0xDF
+    is_letter = (upper >= 65) & (upper <= 90)
+    letters = upper[is_letter] - 65
+    count = len(letters)
+    period = len(rows)
+    key_rows = np.tile(np.array(rows, dtype=np.uint16) * 26, count // period + 2)[key_idx:key_idx + count]
+    table = _FORWARD_ARRAY if encrypt else _INVERSE_ARRAY
+    result = data.copy()
+    result[is_letter] = np.take(table, key_rows + letters)
+    return result.tobytes().decode("ascii"), (key_idx + count) % period
+
+
+def _transform_text(text, key, key_idx, encrypt):
+    key_upper = key.upper()
+    period = len(key)
+    result = []
+    for char in text:
+        if char.isalpha():
+            row = ord(key_upper[key_idx]) - 65
+            col = ord(char.upper()) - 65
+            if encrypt:
+                result.append(VIGENERE_TABLE[row][col])
+            else:
+                # A character with no match in the row (e.g. a non-ASCII letter) is dropped.
+                result.append(INVERSE_TABLE[row].get(chr(col + 65), ""))
+            key_idx = (key_idx + 1) % period
+        else:
+            result.append(char)
+    return "".join(result), key_idx
+
+
+def vigenere_transform(text, key, encrypt=True, key_idx=0):
+    """
+    Encrypts or decrypts one piece of a text and reports where in the key the next piece starts.
+
+    Args:
+        text (str): The text to be encrypted or decrypted.
+        key (str): The key for the Vigenère Cipher.
+        encrypt (bool): True to encrypt, False to decrypt.
+        key_idx (int): The position in the key of the first letter of text.
+
+    Returns:
+        tuple: The encrypted or decrypted text (str) and the key position after it (int).
+    """
+    if np is not None and text.isascii():
+        rows = _key_rows(key)
+        if rows is not None:
+            return _transform_array(text, rows, key_idx, encrypt)
+    return _transform_text(text, key, key_idx, encrypt)
+
+
+def _transform_array_into(array, result, rows, key_idx, encrypt):
+    period = len(rows)
+    # The table row offset of every key position, repeated to cover a whole tile, so no position needs a modulo.
+    row_offsets = workspace.array("row_offsets", TILE_SIZE + period, np.intp)
+    row_offsets[:period] = rows
+    row_offsets[:period] *= 26
+    filled = period
+    while filled < len(row_offsets):
+        count = min(filled, len(row_offsets) - filled)
+        row_offsets[filled:filled + count] = row_offsets[:count]
+        filled += count
+    table = _FORWARD_ARRAY if encrypt else _INVERSE_ARRAY
+    for start in range(0, len(array), TILE_SIZE):
+        tile = array[start:start + TILE_SIZE]
+        out = result[start:start + TILE_SIZE]
+        size = len(tile)
+        # Letter index 0-25 for ASCII letters of either case; any other byte lands outside that range.
+        letters = workspace.array("letters", size, np.uint8)
+        np.bitwise_and(tile, 0xDF, out=letters)
+        np.subtract(letters, 65, out=letters)
+        is_letter = workspace.array("is_letter", size, np.bool_)
+        np.less(letters, 26, out=is_letter)
+        # Only letters advance the key, so the key position of a letter is the number of letters before it.
+        positions = workspace.array("positions", size, np.intp)
+        # Cast first and sum in place: cumsum() of a bool array would cast it into a temporary of the tile's size.
+        np.copyto(positions, is_letter)
+        np.cumsum(positions, out=positions)
+        count = int(positions[-1])
+        # Bytes before the first letter get position -1; they are not letters, so their lookup is never used.
+        np.add(positions, key_idx - 1, out=positions)
+        index = workspace.array("index", size, np.intp)
+        np.take(row_offsets, positions, out=index, mode="wrap")
+        # Adding the uint8 letters directly would cast them through a temporary buffer; positions is free again.
+        np.copyto(positions, letters)
+        np.add(index, positions, out=index)
+        mapped = workspace.array("mapped", size, np.uint8)
+        np.take(table, index, out=mapped, mode="wrap")
+        if not np.may_share_memory(out, tile):
+            np.copyto(out, tile)
+        np.copyto(out, mapped, where=is_letter)
+        key_idx = (key_idx + count) % period
+    return key_idx
+
+
+def vigenere_transform_into(data, out, key, encrypt=True, key_idx=0):
+    """
+    Encrypts or decrypts one piece of binary data into a caller-provided buffer.
+
+    ASCII letters of either case are encrypted to upper case and advance the key; every other byte is copied
+    unchanged, as in vigenere_transform(). Nothing proportional to the input is allocated, and out may be data
+    itself, to work in place.
+
+    Args:
+        data (bytes-like): The data to be encrypted or decrypted (bytes, bytearray, memoryview, mmap, ...).
+        out (bytes-like): A writable buffer of at least len(data) bytes.
+        key (str): The key for the Vigenère Cipher, ASCII letters only.
+        encrypt (bool): True to encrypt, False to decrypt.
+        key_idx (int): The position in the key of the first letter of data.
+
+    Returns:
+        tuple: The number of bytes written (int) and the key position after them (int).
+
+    Raises:
+        ValueError: If the key is empty or contains anything but ASCII letters.
+    """
+    rows = _key_rows(key)
+    if rows is None:
+        raise ValueError("The key must consist of ASCII letters.")
+    source, target = byte_views(data, out)
+    if not source:
+        return 0, key_idx
+    if np is not None:
+        array = np.frombuffer(source, dtype=np.uint8)
+        result = np.frombuffer(target, dtype=np.uint8)
+        return len(source), _transform_array_into(array, result, rows, key_idx, encrypt)
+    table = _FORWARD_BYTES if encrypt else _INVERSE_BYTES
+    period = len(rows)
+    for i, byte in enumerate(source):
+        letter = (byte & 0xDF) - 65
+        if 0 <= letter < 26:
+            target[i] = table[rows[key_idx] * 26 + letter]
+            key_idx = (key_idx + 1) % period
+        else:
+            target[i] = byte
+    return len(source), key_idx
+
+
 def vigenere_cipher(text, key, encrypt=True):
     """
     Performs Vigenère Cipher encryption or decryption on the input text.
-    
+
     Args:
         text (str): The text to be encrypted or decrypted.
         key (str): The key for the Vigenère Cipher.
         encrypt (bool): True to encrypt, False to decrypt.
-    
+
     Returns:
         str: The encrypted or decrypted text.
     """
-    result = ''
-    table = vigenere_table()
-    key_idx = 0
-    for char in text:
-        if char.isalpha():
-            row = ord(key.upper()[key_idx]) - 65
-            col = ord(char.upper()) - 65
-            if encrypt:
-                result += table[row][col]
-            else:
-                for i in range(26):
-                    if table[row][i] == char.upper():
-                        result += table[0][i]
-                        break
-            key_idx = (key_idx + 1) % len(key)
-        else:
-            result += char
-    return result
+    return vigenere_transform(text, key, encrypt)[0]
 
-# Example usage
-plaintext = "HELLO WORLD"
-key = "LEMON"
-ciphertext = vigenere_cipher(plaintext, key, encrypt=True)
-print("Plaintext:", plaintext)
-print("Ciphertext:", ciphertext)
-print("Decrypted text:", vigenere_cipher(ciphertext, key, encrypt=False))
+
+if __name__ == "__main__":
+    # Example usage
+    plaintext = "HELLO WORLD"
+    key = "LEMON"
+    ciphertext = vigenere_cipher(plaintext, key, encrypt=True)
+    print("Plaintext:", plaintext)
+    print("Ciphertext:", ciphertext)
+    print("Decrypted text:", vigenere_cipher(ciphertext, key, encrypt=False))
 
 """
 The key aspects of this Vigenère Cipher implementation are:
 
-1. The vigenere_table() function generates the 26x26 Vigenère table.
+1. The vigenere_table() function generates the 26x26 Vigenère table, and inverse_vigenere_table() maps every
+    ciphertext letter of each row back to its plaintext letter. Both are built once, when the module is imported.
 2. The vigenere_cipher() function performs the actual encryption and decryption, using the Vigenère table.
-    - For each character in the input text, it finds the corresponding row and column in the Vigenère table 
+    - For each character in the input text, it finds the corresponding row and column in the Vigenère table
         based on the current key character and the input character.
     - For encryption, it uses the value at the intersection of the row and column as the encrypted character.
-    - For decryption, it loops through the column corresponding to the key character and finds the row with 
-        the input character, then uses the character at the intersection of the first row and that column as the decrypted character.
-    - The key index is incremented after each character is processed, wrapping around to the beginning of the key if necessary.
-    
-In the example usage, the plaintext "HELLO WORLD" is encrypted using the Vigenère Cipher with the key "LEMON", 
+    - For decryption, it looks the input character up in the inverse table of the key character's row, so both
+        directions are a single indexed lookup.
+    - The key index is incremented after each letter is processed, wrapping around to the beginning of the key if necessary.
+3. When NumPy is available and the text is ASCII, all letters are extracted at once and looked up in array versions of
+    the two tables with a single gather.
+4. vigenere_transform() also returns the key position reached, so a long text can be processed in pieces.
+5. vigenere_transform_into() does the same for binary data, from any buffer into a caller-provided one (or in place).
+    Only letters advance the key, so the NumPy path numbers the letters of each tile with a cumulative sum; every
+    step writes into scratch arrays that are reused between calls, so nothing the size of the input is allocated.
+
+In the example usage, the plaintext "HELLO WORLD" is encrypted using the Vigenère Cipher with the key "LEMON",
 and the resulting ciphertext is then decrypted.
-"""
\ No newline at end of file
+"""
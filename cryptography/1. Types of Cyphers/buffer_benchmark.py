@@ -0,0 +1,196 @@
+import argparse
+import io
+import statistics
+import sys
+import time
+import tracemalloc
+
+from cipher import CIPHERS, get_transform, stream
+from vigenere_benchmark import format_size, parse_size, sample_text
+
+KEYS = {
+    "caesar": "3",
+    "affine": "5,8",
+    "vigenere": "LEMON",
+    "vigenere-table": "LEMON",
+    "playfair": "MONARCHY",
+    "keyed-transposition": "SECURITY",
+    "keyless-transposition": "",
+}
+# Ciphers whose copying API only accepts str, so a binary stream has to be decoded and re-encoded around them.
+TEXT_ONLY = {"vigenere-table", "playfair"}
+
+
+class _NullSink:
+    """
+    A binary sink that discards everything, so the benchmark measures the cipher and not the disk.
+    """
+
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+class _ChunkTracer(_NullSink):
+    """
+    A binary source and null sink in one, which records for every chunk the most memory allocated at once between
+    the first read of the chunk and the write of its result, and the overall peak. tracemalloc must be running.
+    """
+
+    def __init__(self, data):
+        self._source = io.BytesIO(data)
+        self._level = None
+        self.allocated = []
+        self.start = self.peak = tracemalloc.get_traced_memory()[0]
+
+    def _begin(self):
+        if self._level is None:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            self._level = current
+            tracemalloc.reset_peak()
+
+    def read(self, size=-1):
+        self._begin()
+        return self._source.read(size)
+
+    def readinto(self, buffer):
+        self._begin()
+        return self._source.readinto(buffer)
+
+    def write(self, data):
+        peak = tracemalloc.get_traced_memory()[1]
+        self.allocated.append(peak - self._level)
+        self.peak = max(self.peak, peak)
+        self._level = None
+        return len(data)
+
+
+def copying_stream(name, key, source, sink, chunk_size):
+    """
+    Streams bytes through a cipher the way it had to be done before the *_into() functions: every chunk is read
+    into a new bytes object, the cipher returns another one, and text-only ciphers also need a decoded copy and an
+    encoded copy.
+    """
+    transform, chunk_size = get_transform(name, key, True, chunk_size)
+    total = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        if name in TEXT_ONLY:
+            sink.write(transform(chunk.decode("ascii")).encode("ascii"))
+        else:
+            sink.write(transform(chunk))
+        total += len(chunk)
+    sink.flush()
+    return total
+
+
+def buffer_stream(name, key, source, sink, chunk_size):
+    """
+    Streams bytes through a cipher with cipher.stream(), which reads into one reusable buffer and transforms it
+    into another with the cipher's *_into() function.
+    """
+    return stream(name, key, source, sink, True, chunk_size)
+
+
+def measure(function, name, data, chunk_size, repeat):
+    """
+    Times a streaming function on data and then measures its memory use in a separate, traced run.
+
+    Returns:
+        tuple: The best time in seconds, the peak memory allocated on top of the input and the median over all
+            chunks of the memory allocated while processing one, in bytes.
+    """
+    # The first run also allocates the reusable scratch arrays, which later runs do not.
+    function(name, KEYS[name], io.BytesIO(data), _NullSink(), chunk_size)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(name, KEYS[name], io.BytesIO(data), _NullSink(), chunk_size)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        tracer = _ChunkTracer(data)
+        function(name, KEYS[name], tracer, tracer, chunk_size)
+        peak = max(tracer.peak, tracemalloc.get_traced_memory()[1]) - tracer.start
+    finally:
+        tracemalloc.stop()
+    return best, peak, statistics.median(tracer.allocated)
+
+
+def check(name, data, chunk_size):
+    """
+    Checks that both ways of streaming produce the same ciphertext.
+    """
+    outputs = []
+    for function in (copying_stream, buffer_stream):
+        sink = io.BytesIO()
+        function(name, KEYS[name], io.BytesIO(data), sink, chunk_size)
+        outputs.append(sink.getvalue())
+    if outputs[0] != outputs[1]:
+        raise AssertionError(f"{name}: the buffer API gave a different result")
+
+
+def benchmark(ciphers, size=16 << 20, chunk_size=1 << 20, repeat=3):
+    """
+    Prints the throughput, the memory allocated per chunk and the peak memory of streaming size bytes of ASCII
+    text through every cipher, with the copying API and with the buffer API.
+    """
+    data = sample_text(size).encode("ascii")
+    print(f"{format_size(size)} of ASCII text in chunks of {format_size(chunk_size)} (copying API / buffer API):")
+    print(f"  {'cipher':<22}{'throughput (MB/s)':>24}{'':>9}{'per chunk (KB)':>22}{'peak (KB)':>22}")
+    for name in ciphers:
+        check(name, data[:3 * chunk_size + 1], chunk_size)
+        copy_time, copy_peak, copy_chunk = measure(copying_stream, name, data, chunk_size, repeat)
+        buffer_time, buffer_peak, buffer_chunk = measure(buffer_stream, name, data, chunk_size, repeat)
+        print(f"  {name:<22}{size / copy_time / 1e6:>12.1f}{size / buffer_time / 1e6:>12.1f}"
+              f"{copy_time / buffer_time:>8.2f}x{copy_chunk / 1e3:>12,.0f}{buffer_chunk / 1e3:>10,.0f}"
+              f"{copy_peak / 1e3:>12,.0f}{buffer_peak / 1e3:>10,.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare streaming with the copying cipher API and with the "
+                                                 "zero-copy *_into() buffer API.")
+    parser.add_argument("--ciphers", default=",".join(CIPHERS), help="comma-separated ciphers (default: all)")
+    parser.add_argument("--size", default="16M", help="bytes to stream through every cipher (default: 16M)")
+    parser.add_argument("--chunk-size", default="1M", help="bytes per chunk (default: 1M)")
+    parser.add_argument("--repeat", type=int, default=3, help="best-of repeats (default: 3)")
+    args = parser.parse_args(argv)
+
+    ciphers = args.ciphers.split(",")
+    unknown = [name for name in ciphers if name not in CIPHERS]
+    if unknown:
+        parser.error(f"unknown cipher(s): {', '.join(unknown)}; choose from {', '.join(CIPHERS)}")
+    benchmark(ciphers, parse_size(args.size), parse_size(args.chunk_size), args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+A benchmark of the copies and allocations the *_into() buffer API saves when streaming binary data.
+
+1. The copying way is how a binary stream went through the ciphers before: read() returns a new bytes object per
+   chunk, the cipher returns another one, and the Playfair and Vigenère Table ciphers, which only took str, also
+   need a decoded and a re-encoded copy. Each of these is an allocation the size of the chunk.
+2. The buffer way is cipher.stream() on a binary stream: readinto() fills one reusable buffer, the cipher's *_into()
+   function writes into a second one, and the result is written from a memoryview. The ciphers work in 64 KiB tiles,
+   so nothing the size of a chunk is allocated: the NumPy paths go through scratch arrays that are allocated once,
+   while Caesar and Affine make a tile-sized copy and bytes.translate() result per tile and free them again.
+3. Both ways are checked to give the same ciphertext, then timed (best of --repeat, after a warm-up run that also
+   allocates the scratch arrays), and then run once more under tracemalloc, reading from and writing to a tracer
+   that records the memory allocated between reading each chunk and writing its result (the median over all chunks
+   is reported) and the overall peak on top of the input. Per chunk, the copying way allocates one to several times
+   the chunk size; the buffer way allocates at most a few tiles, and its peak is the two stream buffers, however
+   large the input is.
+
+Examples:
+
+    python buffer_benchmark.py
+    python buffer_benchmark.py --size 256M --chunk-size 16M --ciphers caesar,vigenere,keyed-transposition
+"""
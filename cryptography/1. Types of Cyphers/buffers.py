@@ -0,0 +1,102 @@
+import threading
+
+# The *_into() functions of the cipher scripts work through their input in tiles of this many bytes, so their
+# temporaries are a few tiles in size (and reused) however large the buffers are.
+TILE_SIZE = 1 << 16
+
+
+def byte_views(data, out, length=None):
+    """
+    Returns flat unsigned-byte memoryviews of an input buffer and an output buffer.
+
+    Any object supporting the buffer protocol works: bytes, bytearray, memoryview, mmap, array.array or a
+    contiguous NumPy array.
+
+    Args:
+        data (bytes-like): The input.
+        out (bytes-like): The output; it must be writable.
+        length (int): The number of bytes that will be written to out (default: len(data)).
+
+    Returns:
+        tuple: (source, target) memoryviews; target is cut to length.
+
+    Raises:
+        TypeError: If out is read-only.
+        ValueError: If out is too small.
+    """
+    source = memoryview(data).cast("B")
+    target = memoryview(out).cast("B")
+    if target.readonly:
+        raise TypeError("The output buffer must be writable.")
+    length = len(source) if length is None else length
+    if len(target) < length:
+        raise ValueError(f"The output buffer holds {len(target)} bytes but {length} are needed.")
+    return source, target[:length]
+
+
+def overlaps(source, target):
+    """
+    Returns True if two memoryviews may share memory.
+
+    Without NumPy only views of the same underlying object are detected, which is also what the in-place mode of
+    the *_into() functions looks like.
+    """
+    # NumPy is imported here rather than at the top, so ciphers without a NumPy path (Caesar) start without it.
+    try:
+        import numpy as np
+    except ImportError:
+        return source.obj is target.obj
+    return np.may_share_memory(np.frombuffer(source, dtype=np.uint8), np.frombuffer(target, dtype=np.uint8))
+
+
+def translate_into(source, target, table):
+    """
+    Maps every byte of source through a 256-entry table into target, one tile at a time.
+
+    bytes.translate() is about twice as fast as a NumPy gather on a 256-entry table, but it always returns a new
+    object; applied per tile, its temporaries stay TILE_SIZE bytes however large the buffers are. target may be
+    source itself.
+    """
+    for start in range(0, len(source), TILE_SIZE):
+        end = start + TILE_SIZE
+        target[start:end] = bytes(source[start:end]).translate(table)
+
+
+class Workspace(threading.local):
+    """
+    Scratch NumPy arrays that are allocated on first use and then reused, one set per thread.
+    """
+
+    def __init__(self):
+        self.arrays = {}
+
+    def array(self, name, size, dtype):
+        """
+        Returns a scratch array of at least size elements of dtype, cut to size. Only the NumPy paths call this.
+        """
+        import numpy as np
+
+        array = self.arrays.get((name, dtype))
+        if array is None or len(array) < size:
+            array = self.arrays[(name, dtype)] = np.empty(max(size, TILE_SIZE), dtype=dtype)
+        return array[:size]
+
+
+workspace = Workspace()
+
+"""
+Shared helpers for the zero-copy *_into() functions of the cipher scripts in this folder.
+
+1. byte_views() accepts any buffer, checks that the output is writable and large enough, and returns flat byte
+   memoryviews, so the ciphers never decode, copy or re-encode their input.
+2. The ciphers never allocate anything proportional to the input. Byte-table ciphers go through translate_into(),
+   which still makes two tile-sized temporaries per tile (the copy of the tile and the result of bytes.translate());
+   the NumPy paths write through out= arguments into the scratch arrays of workspace, which are allocated once per
+   thread and reused by every later call, so they allocate nothing at all. This module does not import NumPy
+   itself until overlaps() or a workspace array needs it, so a cipher without a NumPy path starts without it.
+3. A cipher that maps every byte to the same position (Caesar, Affine, Vigenère, Playfair) may be given the same
+   buffer as input and output and then works in place. The transposition ciphers move bytes around, so they use
+   overlaps() to reject that.
+
+See buffer_benchmark.py for the copies and allocations this saves.
+"""
@@ -0,0 +1,269 @@
+import argparse
+import os
+import random
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from script_loader import load_script
+
+# Relative frequencies of the letters A-Z in English text.
+ENGLISH_FREQUENCIES = (
+    0.08167, 0.01492, 0.02782, 0.04253, 0.12702, 0.02228, 0.02015, 0.06094, 0.06966,
+    0.00153, 0.00772, 0.04025, 0.02406, 0.06749, 0.07507, 0.01929, 0.00095, 0.05987,
+    0.06327, 0.09056, 0.02758, 0.00978, 0.02360, 0.00150, 0.01974, 0.00074,
+)
+
+VALID_A = (1, 3, 5, 7, 9, 11, 15, 17, 19, 21, 23, 25)
+
+KEYS = {
+    "caesar": list(range(26)),
+    "affine": [(a, b) for a in VALID_A for b in range(26)],
+}
+
+Candidate = namedtuple("Candidate", ["score", "key", "plaintext"])
+
+
+def _key_index(cipher):
+    """
+    Returns, for every key, the ciphertext letter that each plaintext letter maps to.
+
+    Row k of the result lets the plaintext histogram under key k be read straight out of the
+    ciphertext histogram, so no candidate ever has to be decrypted to be scored.
+    """
+    rows = []
+    for key in KEYS[cipher]:
+        a, b = (1, key) if cipher == "caesar" else key
+        rows.append([(a * p + b) % 26 for p in range(26)])
+    return rows
+
+
+def _key_weights(cipher):
+    """
+    Returns a (keys, 26) matrix with 1 / English frequency of the plaintext letter that each
+    ciphertext letter decrypts to under each key.
+
+    Because sum(observed) == sum(expected) == N, the chi-squared statistic reduces to
+    sum(observed ** 2 / expected) - N, so scoring every key is a single matrix product of the
+    squared ciphertext histogram with this matrix.
+    """
+    weights = np.zeros((len(KEYS[cipher]), 26))
+    for k, row in enumerate(_INDEX[cipher]):
+        for p, c in enumerate(row):
+            weights[k, c] = 1.0 / ENGLISH_FREQUENCIES[p]
+    return weights
+
+
+_INDEX = {cipher: _key_index(cipher) for cipher in KEYS}
+_WEIGHTS = {cipher: _key_weights(cipher) for cipher in KEYS} if np is not None else None
+
+
+def letter_histogram(text):
+    """
+    Counts the letters A-Z in a text, ignoring case and any other character.
+    """
+    data = text.upper().encode("ascii", "ignore")
+    if np is not None:
+        return np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)[65:91]
+    return [data.count(code) for code in range(65, 91)]
+
+
+def score_histograms(histograms, cipher="caesar"):
+    """
+    Scores every key of a cipher against English with the chi-squared statistic.
+
+    Args:
+        histograms: A sequence of 26-entry letter histograms, one per ciphertext.
+        cipher (str): "caesar" (26 keys) or "affine" (312 keys).
+
+    Returns:
+        A (len(histograms), number of keys) table of scores; lower is more English-like.
+    """
+    if np is not None:
+        counts = np.asarray(histograms, dtype=np.float64).reshape(-1, 26)
+        totals = counts.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = (counts ** 2 @ _WEIGHTS[cipher].T) / totals - totals
+        return np.nan_to_num(scores, nan=0.0)
+    table = []
+    for hist in histograms:
+        total = sum(hist)
+        expected = [total * freq for freq in ENGLISH_FREQUENCIES]
+        if total == 0:
+            table.append([0.0] * len(KEYS[cipher]))
+            continue
+        table.append([
+            sum((hist[c] - e) ** 2 / e for c, e in zip(row, expected))
+            for row in _INDEX[cipher]
+        ])
+    return table
+
+
+def _decrypt(text, key, cipher):
+    if cipher == "caesar":
+        return load_script("Caesar-cypher.py").caesar_cipher(text, key, encrypt=False)
+    a, b = key
+    return load_script("Affine-cypher.py").affine_cipher(text, a, b, encrypt=False)
+
+
+def _rank(text, scores, order, cipher):
+    keys = KEYS[cipher]
+    return [Candidate(float(scores[i]), keys[i], _decrypt(text, keys[i], cipher)) for i in order]
+
+
+def crack(ciphertext, cipher="caesar", top_k=3):
+    """
+    Tries every key of a Caesar or Affine cipher and ranks the decryptions.
+
+    Args:
+        ciphertext (str): The text to be cracked.
+        cipher (str): "caesar" or "affine".
+        top_k (int): The number of candidates to return.
+
+    Returns:
+        list: The best Candidate(score, key, plaintext) tuples, most likely first.
+    """
+    return crack_batch([ciphertext], cipher, top_k)[0]
+
+
+def crack_batch(ciphertexts, cipher="caesar", top_k=3):
+    """
+    Cracks a batch of ciphertexts in the current process, scoring them in one vectorized pass.
+    """
+    scores = score_histograms([letter_histogram(text) for text in ciphertexts], cipher)
+    if np is not None:
+        orders = np.argsort(scores, axis=1, kind="stable")[:, :top_k]
+    else:
+        orders = [sorted(range(len(row)), key=row.__getitem__)[:top_k] for row in scores]
+    return [_rank(*args, cipher) for args in zip(ciphertexts, scores, orders)]
+
+
+def _crack_batch_job(args):
+    return crack_batch(*args)
+
+
+def crack_many(ciphertexts, cipher="caesar", top_k=3, workers=None, batch_size=1024, window=None):
+    """
+    Cracks a large corpus of ciphertexts by fanning batches out over a process pool.
+
+    Batches are read and submitted ahead of the consumer, but never more than window at a time, so memory stays
+    bounded however long the corpus is.
+
+    Args:
+        ciphertexts (iterable): The texts to be cracked.
+        cipher (str): "caesar" or "affine".
+        top_k (int): The number of candidates to return per ciphertext.
+        workers (int): The number of worker processes (default: one per CPU).
+        batch_size (int): The number of ciphertexts sent to a worker at a time.
+        window (int): The largest number of batches in flight (default: twice the number of workers).
+
+    Yields:
+        list: The ranked candidates of each ciphertext, in input order.
+    """
+    def batches():
+        batch = []
+        for text in ciphertexts:
+            batch.append(text)
+            if len(batch) == batch_size:
+                yield batch, cipher, top_k
+                batch = []
+        if batch:
+            yield batch, cipher, top_k
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for args in batches():
+            yield from crack_batch(*args)
+        return
+    window = window or 2 * workers
+    pending = batches()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        while True:
+            for args in pending:
+                in_flight.append(executor.submit(_crack_batch_job, args))
+                if len(in_flight) >= window:
+                    break
+            if not in_flight:
+                break
+            yield from in_flight.popleft().result()
+
+
+def benchmark(cipher="affine", count=20000, length=200, workers_list=None):
+    """
+    Measures keys tried per second, overall and per core, for increasing worker counts.
+    """
+    rng = random.Random(0)
+    words = ("the quick brown fox jumps over a lazy dog while seven wizards quietly hex "
+             "every frozen judge and my packing box of liquor jugs").split()
+    encrypt = load_script("Caesar-cypher.py").caesar_cipher
+    affine = load_script("Affine-cypher.py").affine_cipher
+    corpus = []
+    for _ in range(count):
+        text = " ".join(rng.choice(words) for _ in range(length // 5))[:length]
+        if cipher == "caesar":
+            corpus.append(encrypt(text, rng.randrange(26)))
+        else:
+            a, b = rng.choice(KEYS["affine"])
+            corpus.append(affine(text, a, b))
+    if workers_list is None:
+        workers_list = sorted({1, 2, 4, os.cpu_count() or 1})
+    keys_tried = count * len(KEYS[cipher])
+    print(f"{cipher}: {count} ciphertexts x {len(KEYS[cipher])} keys, {length} chars each")
+    for workers in workers_list:
+        start = time.perf_counter()
+        for _ in crack_many(corpus, cipher, top_k=1, workers=workers):
+            pass
+        elapsed = time.perf_counter() - start
+        rate = keys_tried / elapsed
+        print(f"  {workers:>3} worker(s): {rate:14,.0f} keys/s  {rate / workers:14,.0f} keys/s/core")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Brute-force Caesar or Affine ciphertexts, one per line of input.")
+    parser.add_argument("cipher", choices=sorted(KEYS))
+    parser.add_argument("input", nargs="?", help="file with one ciphertext per line (default: stdin)")
+    parser.add_argument("-k", "--top-k", type=int, default=1)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--benchmark", action="store_true", help="run the keys/second benchmark")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark(args.cipher)
+        return 0
+    source = open(args.input, encoding="utf-8") if args.input else sys.stdin
+    with source:
+        lines = (line.rstrip("\n") for line in source)
+        for candidates in crack_many(lines, args.cipher, args.top_k, args.workers):
+            for candidate in candidates:
+                print(f"{candidate.score:.2f}\t{candidate.key}\t{candidate.plaintext}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+The key aspects of this Caesar/Affine cracker are:
+
+1. Every ciphertext is reduced to a 26-entry letter histogram once. Under a key (a, b) the plaintext letter p was
+   encrypted to (a * p + b) % 26, so the plaintext histogram for any key is just a re-indexing of the ciphertext
+   histogram. score_histograms() turns this into one matrix product per batch, giving the chi-squared distance
+   from English for all 26 Caesar or 312 Affine keys of every ciphertext without decrypting anything.
+2. Only the top-k keys are actually decrypted, using caesar_cipher() and affine_cipher() from the cipher scripts.
+3. crack_many() sends batches of ciphertexts to a process pool and yields results in input order. At most window
+   batches are in flight at a time (a deque whose oldest future is always the next one to yield), so the input is
+   read only as fast as results are consumed and corpora of millions of lines can be streamed through it.
+
+Example:
+
+    python caesar_affine_cracker.py affine intercepted.txt --top-k 3
+    python caesar_affine_cracker.py caesar --benchmark
+"""
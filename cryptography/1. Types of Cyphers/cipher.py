@@ -0,0 +1,282 @@
+import argparse
+import io
+import sys
+import time
+from collections import namedtuple
+
+from script_loader import load_script
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# script: the file implementing the cipher, loaded only when the cipher is used.
+# make: builds the chunk transform from the loaded module, the key and the direction.
+# align: the chunk size is rounded down to a multiple of align(module, key), so chunk boundaries never split a
+#     digraph or a transposition grid.
+# make_into: builds the transform for raw bytes, called as transform(data, out) with a reusable output buffer; it
+#     returns the number of bytes written.
+Cipher = namedtuple("Cipher", ["script", "key_help", "make", "align", "make_into"])
+
+
+def _caesar(module, key, encrypt):
+    text_table = module.caesar_table(int(key), encrypt)
+    bytes_table = module.caesar_bytes_table(int(key), encrypt)
+    return lambda chunk: chunk.translate(text_table if isinstance(chunk, str) else bytes_table)
+
+
+def _caesar_into(module, key, encrypt):
+    shift = int(key)
+    return lambda data, out: module.caesar_cipher_into(data, out, shift, encrypt)
+
+
+def _affine_key(key):
+    a, b = (int(part) for part in key.split(","))
+    return a, b
+
+
+def _affine(module, key, encrypt):
+    cipher = module.get_cipher(*_affine_key(key))
+    return lambda chunk: cipher.transform(chunk, encrypt)
+
+
+def _affine_into(module, key, encrypt):
+    cipher = module.get_cipher(*_affine_key(key))
+    return lambda data, out: cipher.transform_into(data, out, encrypt)
+
+
+def _vigenere_keyword(module, key, encrypt):
+    return module.VigenereStream(key, encrypt).update
+
+
+def _vigenere_keyword_into(module, key, encrypt):
+    return module.VigenereStream(key, encrypt).update_into
+
+
+def _vigenere_table(module, key, encrypt):
+    key_idx = 0
+
+    def transform(chunk):
+        nonlocal key_idx
+        result, key_idx = module.vigenere_transform(chunk, key, encrypt, key_idx)
+        return result
+    return transform
+
+
+def _vigenere_table_into(module, key, encrypt):
+    key_idx = 0
+
+    def transform(data, out):
+        nonlocal key_idx
+        written, key_idx = module.vigenere_transform_into(data, out, key, encrypt, key_idx)
+        return written
+    return transform
+
+
+def _playfair(module, key, encrypt):
+    playfair_key = module.get_playfair_key(key)
+    return lambda chunk: playfair_key.transform(chunk, encrypt)
+
+
+def _playfair_into(module, key, encrypt):
+    playfair_key = module.get_playfair_key(key)
+    return lambda data, out: playfair_key.transform_into(data, out, encrypt)
+
+
+def _keyed_transposition(module, key, encrypt):
+    order = module.column_order(key)
+    return lambda block: module.transpose(block, order, encrypt)
+
+
+def _keyed_transposition_into(module, key, encrypt):
+    order = module.column_order(key)
+    return lambda data, out: module.transpose_into(data, out, order, encrypt)
+
+
+def _keyless_transposition(module, key, encrypt):
+    return lambda block: module.keyless_transposition_cipher(block, encrypt)
+
+
+def _keyless_transposition_into(module, key, encrypt):
+    return lambda data, out: module.keyless_transposition_cipher_into(data, out, encrypt)
+
+
+def _one(module, key):
+    return 1
+
+
+CIPHERS = {
+    "caesar": Cipher("Caesar-cypher.py", "the shift, e.g. 3", _caesar, _one, _caesar_into),
+    "affine": Cipher("Affine-cypher.py", "a,b with a coprime to 26, e.g. 5,8", _affine, _one, _affine_into),
+    "vigenere": Cipher("VigenereCipher_Keyword-Method.py", "a keyword, e.g. KEY", _vigenere_keyword, _one,
+                       _vigenere_keyword_into),
+    "vigenere-table": Cipher("VigenereCipher_Vigenere-Table-Method.py", "a keyword of letters, e.g. LEMON",
+                             _vigenere_table, _one, _vigenere_table_into),
+    "playfair": Cipher("Playfair-cypher.py", "a keyword, e.g. MONARCHY", _playfair, lambda module, key: 2,
+                       _playfair_into),
+    "keyed-transposition": Cipher("TranspositionCipher_Keyed-Transposition-Cipher.py", "a keyword, e.g. SECURITY",
+                                  _keyed_transposition, lambda module, key: len(module.column_order(key)),
+                                  _keyed_transposition_into),
+    "keyless-transposition": Cipher("TranspositionCipher_Keyless-Transposition-Cipher.py", "not used",
+                                    _keyless_transposition, _one, _keyless_transposition_into),
+}
+
+
+def get_transform(name, key, encrypt=True, chunk_size=DEFAULT_CHUNK_SIZE, into=False):
+    """
+    Loads the implementation of a cipher and returns a function that encrypts or decrypts consecutive chunks.
+
+    The returned function keeps whatever state the cipher needs between chunks (such as the position in a
+    Vigenère key), so it must be given the chunks of one message in order.
+
+    Args:
+        name (str): A name from CIPHERS.
+        key (str): The key, in the format given by the cipher's key_help.
+        encrypt (bool): True to encrypt, False to decrypt.
+        chunk_size (int): The requested chunk size.
+        into (bool): Return the raw-bytes transform, called as transform(data, out), which writes into out and
+            returns the number of bytes written (one more than len(data) for Playfair on an odd final chunk).
+
+    Returns:
+        tuple: The transform function and the chunk size to read, adjusted to the cipher's alignment.
+    """
+    cipher = CIPHERS[name]
+    module = load_script(cipher.script)
+    align = cipher.align(module, key)
+    make = cipher.make_into if into else cipher.make
+    return make(module, key, encrypt), max(chunk_size - chunk_size % align, align)
+
+
+def _read_into(source, view):
+    """
+    Fills view from a binary stream, stopping short only at the end of the stream (a pipe may return less on a
+    single read).
+
+    Returns:
+        int: The number of bytes read.
+    """
+    size = 0
+    while size < len(view):
+        count = source.readinto(view[size:])
+        if not count:
+            break
+        size += count
+    return size
+
+
+def stream(name, key, source, sink, encrypt=True, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encrypts or decrypts a stream with any registered cipher, one chunk at a time.
+
+    For the transposition ciphers every chunk is transposed on its own, so the chunk size is part of the key:
+    the same chunk size must be used to decrypt. Binary streams are read into one reusable buffer and transformed
+    into another, so nothing the size of a chunk is allocated; Caesar and Affine still make two short-lived 64 KiB
+    temporaries per tile, a copy and its bytes.translate() result.
+
+    Args:
+        name (str): A name from CIPHERS.
+        key (str): The key.
+        source: A readable file object (text or binary).
+        sink: A writable file object of the same kind as source.
+        encrypt (bool): True to encrypt, False to decrypt.
+        chunk_size (int): The number of characters or bytes read per chunk.
+
+    Returns:
+        int: The number of characters or bytes processed.
+    """
+    if not isinstance(source, io.TextIOBase):
+        transform, chunk_size = get_transform(name, key, encrypt, chunk_size, into=True)
+        chunk = memoryview(bytearray(chunk_size))
+        # One spare byte for the padding Playfair adds to an odd final chunk.
+        out = memoryview(bytearray(chunk_size + 1))
+        total = 0
+        while True:
+            size = _read_into(source, chunk)
+            if not size:
+                break
+            sink.write(out[:transform(chunk[:size], out)])
+            total += size
+        sink.flush()
+        return total
+    transform, chunk_size = get_transform(name, key, encrypt, chunk_size)
+    total = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        sink.write(transform(chunk))
+        total += len(chunk)
+    sink.flush()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a file or stdin through one of the classical ciphers.",
+                                     epilog="ciphers and keys: " + "; ".join(
+                                         f"{name} ({cipher.key_help})" for name, cipher in CIPHERS.items()))
+    parser.add_argument("cipher", choices=CIPHERS)
+    parser.add_argument("-k", "--key", default="", help="the key (see below)")
+    parser.add_argument("input", nargs="?", help="input file (default: stdin)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("-d", "--decrypt", action="store_true", help="decrypt instead of encrypt")
+    parser.add_argument("-b", "--binary", action="store_true", help="process raw bytes instead of characters")
+    parser.add_argument("--encoding", default="utf-8", help="text encoding (default: utf-8)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="characters or bytes per chunk; the block size of the transposition ciphers")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not report the throughput on stderr")
+    # Intermixed parsing lets options appear between the cipher name and the input file.
+    args = parser.parse_intermixed_args(argv)
+    if not args.key and args.cipher != "keyless-transposition":
+        parser.error(f"{args.cipher} needs a key: {CIPHERS[args.cipher].key_help}")
+    if args.chunk_size < 1:
+        parser.error("the chunk size must be positive")
+
+    source = open(args.input, "rb") if args.input else sys.stdin.buffer
+    sink = open(args.output, "wb") if args.output else sys.stdout.buffer
+    if not args.binary:
+        source = io.TextIOWrapper(source, encoding=args.encoding, newline="")
+        sink = io.TextIOWrapper(sink, encoding=args.encoding, newline="")
+    start = time.perf_counter()
+    try:
+        total = stream(args.cipher, args.key, source, sink, not args.decrypt, args.chunk_size)
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            sink.close()
+    elapsed = time.perf_counter() - start
+    if not args.quiet:
+        unit = "bytes" if args.binary else "characters"
+        print(f"{args.cipher}: {total:,} {unit} in {elapsed:.3f}s "
+              f"({total / max(elapsed, 1e-9) / 1e6:.1f} million {unit}/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+A single command line interface for all the ciphers in this folder.
+
+1. CIPHERS maps each cipher name to the script that implements it. Scripts are only imported (with
+   script_loader.load_script()) once their cipher has been selected, so starting the tool costs little more than
+   starting Python, and NumPy is only imported by the ciphers that use it.
+2. Every cipher is wrapped as a function from one chunk to the next piece of output. Stateful ciphers keep their
+   position between chunks (VigenereStream for the Keyword method, the key index for the Table method), so chunked
+   output is identical to encrypting the whole input at once.
+3. Chunk sizes are rounded down to a multiple of 2 for Playfair, so no digraph is split, and to a multiple of the
+   number of columns for the Keyed Transposition Cipher. The transposition ciphers transpose every chunk as its own
+   block, like the --block-size mode of their scripts.
+4. The input is streamed from stdin (or a file) to stdout (or a file) in chunks, so memory use does not depend on the
+   input size, and the throughput is reported on stderr.
+5. With --binary every chunk is read into the same buffer with readinto() and transformed by the cipher's *_into()
+   function into a second reusable buffer, which is written out from a memoryview, so nothing the size of a chunk
+   is allocated. The NumPy paths reuse their scratch arrays; Caesar and Affine translate 64 KiB tiles with
+   bytes.translate(), which makes a tile-sized copy and result per tile. Every cipher works on raw bytes this way
+   (the letter ciphers only change ASCII letters).
+
+Examples:
+
+    python cipher.py caesar -k 3 < plain.txt > secret.txt
+    python cipher.py affine -k 5,8 -d secret.txt
+    cat big.log | python cipher.py caesar -k 7 | python cipher.py caesar -k 7 -d | cmp - big.log
+    python cipher.py keyless-transposition -b image.png -o image.enc
+"""
@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from script_loader import load_script
+from vigenere_benchmark import format_size, parse_size, sample_text
+
+DEFAULT_SIZES = "1K,10K,100K,1M,10M,100M,1G"
+DEFAULT_THRESHOLD = 0.10
+# Size of the unreported run used to project the cost of a cipher when its first size is larger than this.
+PROBE_SIZE = 1 << 20
+
+# The whole-message function of every cipher, called as function(module, text, encrypt).
+CASES = {
+    "caesar": ("Caesar-cypher.py", lambda m, text, encrypt: m.caesar_cipher(text, 3, encrypt)),
+    "affine": ("Affine-cypher.py", lambda m, text, encrypt: m.affine_cipher(text, 5, 8, encrypt)),
+    "vigenere-keyword": ("VigenereCipher_Keyword-Method.py",
+                         lambda m, text, encrypt: m.vigenere_cipher(text, "LEMON", encrypt)),
+    "vigenere-table": ("VigenereCipher_Vigenere-Table-Method.py",
+                       lambda m, text, encrypt: m.vigenere_cipher(text, "LEMON", encrypt)),
+    "playfair": ("Playfair-cypher.py", lambda m, text, encrypt: m.playfair_cipher(text, "MONARCHY", encrypt)),
+    "keyed-transposition": ("TranspositionCipher_Keyed-Transposition-Cipher.py",
+                            lambda m, text, encrypt: m.keyed_transposition_cipher(text, "SECURITY", encrypt)),
+    "keyless-transposition": ("TranspositionCipher_Keyless-Transposition-Cipher.py",
+                              lambda m, text, encrypt: m.keyless_transposition_cipher(text, encrypt)),
+}
+
+
+def physical_memory():
+    """
+    Returns the physical memory in bytes, or None where the platform does not report it.
+    """
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def measure(function, module, text, encrypt, repeat):
+    """
+    Times a cipher call and then measures its peak memory in a separate, traced call.
+
+    Fast calls are looped (timeit's autorange) so that each timing lasts at least 0.2 seconds.
+
+    Returns:
+        tuple: The best time per call in seconds, the peak memory allocated during the call in bytes, and the output.
+    """
+    timer = timeit.Timer(lambda: function(module, text, encrypt))
+    number, elapsed = timer.autorange()
+    best = min([elapsed] + timer.repeat(repeat - 1, number)) / number
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        output = function(module, text, encrypt)
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return best, peak, output
+
+
+def run(ciphers, sizes, repeat=3, time_limit=60.0, memory_limit=None):
+    """
+    Measures every cipher in both directions at every size.
+
+    A cipher skips the remaining sizes once the previous size (or a 1 MiB probe), scaled up linearly, would take
+    longer than time_limit seconds or allocate more than memory_limit bytes.
+
+    Returns:
+        list: One dict per measurement with the keys cipher, direction, size, seconds, mb_per_s and peak_bytes.
+    """
+    results = []
+    modules = {name: load_script(CASES[name][0]) for name in ciphers}
+    for name in ciphers:
+        function = CASES[name][1]
+        last = None
+        for size in sizes:
+            if last is None and size > PROBE_SIZE:
+                seconds, peak, _ = measure(function, modules[name], sample_text(PROBE_SIZE), True, 1)
+                last = {"size": PROBE_SIZE, "seconds": seconds, "peak_bytes": peak}
+            if last is not None:
+                scale = size / last["size"]
+                if last["seconds"] * scale > time_limit or (
+                        memory_limit is not None and last["peak_bytes"] * scale > memory_limit):
+                    print(f"{name:<22} {format_size(size):>6}  skipped (projected over the limits)", file=sys.stderr)
+                    break
+            text = sample_text(size)
+            repeats = repeat if size <= (1 << 20) else 1
+            data = text
+            for direction in ("encrypt", "decrypt"):
+                seconds, peak, data = measure(function, modules[name], data, direction == "encrypt", repeats)
+                result = {"cipher": name, "direction": direction, "size": size, "seconds": seconds,
+                          "mb_per_s": size / seconds / 1e6, "peak_bytes": peak}
+                results.append(result)
+                print(f"{name:<22} {format_size(size):>6}  {direction:<8}{result['mb_per_s']:>10.1f} MB/s"
+                      f"{peak / 1e6:>12.1f} MB peak", file=sys.stderr)
+            del text, data
+            last = max(results[-2:], key=lambda r: r["seconds"])
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "numpy": np.__version__ if np is not None else None,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares results with a baseline run.
+
+    Args:
+        results (list): Measurements from run().
+        baseline (list): Measurements from an earlier run().
+        threshold (float): The allowed relative drop in throughput (0.1 = 10%).
+
+    Returns:
+        list: (result, baseline result, relative change, regressed) for every measurement present in both runs,
+            where regressed is True if the throughput dropped by more than threshold.
+    """
+    index = {(r["cipher"], r["direction"], r["size"]): r for r in baseline}
+    changes = []
+    for result in results:
+        old = index.get((result["cipher"], result["direction"], result["size"]))
+        if old is not None:
+            change = result["mb_per_s"] / old["mb_per_s"] - 1
+            changes.append((result, old, change, change < -threshold))
+    return changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the throughput and peak memory of every classical cipher.")
+    parser.add_argument("--ciphers", default=",".join(CASES),
+                        help="comma-separated ciphers to measure (default: all)")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"comma-separated input sizes (default: {DEFAULT_SIZES})")
+    parser.add_argument("--repeat", type=int, default=3, help="best-of repeats for inputs up to 1M (default: 3)")
+    parser.add_argument("--time-limit", type=float, default=60.0,
+                        help="skip sizes projected to take longer than this many seconds (default: 60)")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative throughput drop reported as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    ciphers = args.ciphers.split(",")
+    unknown = [name for name in ciphers if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cipher(s): {', '.join(unknown)}; choose from {', '.join(CASES)}")
+    memory = physical_memory()
+    results = run(ciphers, [parse_size(size) for size in args.sizes.split(",")], args.repeat, args.time_limit,
+                  memory // 4 if memory else None)
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = 0
+    print(f"\n{'cipher':<22} {'size':>6}  {'direction':<10}{'baseline':>10}{'now':>10}{'change':>9}")
+    for result, old, change, regressed in compare(results, baseline, args.threshold):
+        flag = "  REGRESSION" if regressed else ""
+        regressions += regressed
+        print(f"{result['cipher']:<22} {format_size(result['size']):>6}  {result['direction']:<10}"
+              f"{old['mb_per_s']:>10.1f}{result['mb_per_s']:>10.1f}{change:>+9.1%}{flag}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+A throughput and memory benchmark for all the classical ciphers in this folder.
+
+1. Every cipher's whole-message function is timed on ASCII text from 1 KB to 1 GB, encrypting the sample and then
+   decrypting the ciphertext. Fast calls are repeated in a loop and inputs up to 1 MB report the best of several
+   timings.
+2. Peak memory is measured with tracemalloc in a separate call, so tracing does not distort the timings. It counts the
+   memory allocated by the call on top of its input, including NumPy arrays.
+3. Large sizes are skipped for a cipher when the previous size, scaled up linearly, would take longer than
+   --time-limit seconds or allocate more than a quarter of the physical memory. Pure Python paths such as the
+   Playfair cipher would otherwise run for hours or exhaust memory at 1 GB.
+4. --output writes the measurements, together with the Python and NumPy versions and the machine, to JSON.
+   --baseline compares a run with an earlier JSON file and exits with status 1 if any cipher, direction and size got
+   slower by more than --threshold, so the benchmark can gate changes in CI.
+
+Examples:
+
+    python cipher_benchmark.py --sizes 1K,1M,100M -o baseline.json
+    python cipher_benchmark.py --sizes 1K,1M,100M --baseline baseline.json --threshold 0.15
+"""
@@ -0,0 +1,212 @@
+import argparse
+import mmap
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from buffers import translate_into
+from script_loader import load_script
+
+DEFAULT_CHUNK_SIZE = 16 << 20
+# Workers transform their chunk in blocks of this size.
+BLOCK_SIZE = 1 << 20
+
+SCRIPTS = {
+    "caesar": "Caesar-cypher.py",
+    "affine": "Affine-cypher.py",
+    "vigenere": "VigenereCipher_Keyword-Method.py",
+}
+
+# Set in every worker process by _init_worker().
+_PATHS = None
+_TRANSFORM = None
+
+
+def _table_transform(table):
+    """
+    Returns a block transform that maps every byte of the input through a 256-entry table.
+    """
+    def transform(source, sink, start, end):
+        # Straight from the input map into the output map, through tile-sized temporaries only.
+        translate_into(memoryview(source)[start:end], memoryview(sink)[start:end], table)
+    return transform
+
+
+def make_transform(cipher, key, encrypt=True):
+    """
+    Builds the block transform for a cipher.
+
+    The transform is called as transform(source, sink, start, end) and replaces bytes start:end of the output map
+    sink with the encryption or decryption of the same bytes of the input map source. It depends only on the
+    offsets, never on which blocks were processed before, so blocks can be processed in any order by any process.
+
+    Args:
+        cipher (str): A name from SCRIPTS.
+        key (str): The shift for Caesar, "a,b" for Affine, the keyword for Vigenère.
+        encrypt (bool): True to encrypt, False to decrypt.
+
+    Returns:
+        The transform function.
+    """
+    module = load_script(SCRIPTS[cipher])
+    if cipher == "caesar":
+        return _table_transform(module.caesar_bytes_table(int(key), encrypt))
+    if cipher == "affine":
+        a, b = (int(part) for part in key.split(","))
+        return _table_transform(module.get_cipher(a, b).table(encrypt))
+    module.VigenereStream(key)  # Validate the key before any worker starts.
+
+    def transform(source, sink, start, end):
+        # The Keyword method advances the key on every byte, so the key position of a block is its file offset.
+        stream = module.VigenereStream(key, encrypt, offset=start)
+        stream.update_into(memoryview(source)[start:end], memoryview(sink)[start:end])
+    return transform
+
+
+def _init_worker(input_path, output_path, cipher, key, encrypt):
+    global _PATHS, _TRANSFORM
+    _PATHS = (input_path, output_path)
+    _TRANSFORM = make_transform(cipher, key, encrypt)
+
+
+def _process_chunk(start, end):
+    """
+    Maps both files, transforms bytes start:end block by block and flushes the output map before unmapping it.
+    """
+    input_path, output_path = _PATHS
+    with open(input_path, "rb") as source_file, open(output_path, "r+b") as sink_file:
+        with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as source, \
+                mmap.mmap(sink_file.fileno(), 0, access=mmap.ACCESS_WRITE) as sink:
+            for block in range(start, end, BLOCK_SIZE):
+                _TRANSFORM(source, sink, block, min(block + BLOCK_SIZE, end))
+            sink.flush()
+    return end - start
+
+
+def encrypt_file(input_path, output_path, cipher, key, encrypt=True, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encrypts or decrypts a file of any size with a substitution cipher, in parallel.
+
+    The output file is created at its final size up front. Every worker process memory-maps both files and
+    writes its chunks straight into the output map, so no process ever holds a copy of the whole file: the
+    only data that moves between processes are chunk offsets.
+
+    Args:
+        input_path (str): The file to read.
+        output_path (str): The file to write; it is created or overwritten, and must not be input_path.
+        cipher (str): "caesar", "affine" or "vigenere" (the Keyword method).
+        key (str): The shift for Caesar, "a,b" for Affine, the keyword for Vigenère.
+        encrypt (bool): True to encrypt, False to decrypt.
+        workers (int): The number of worker processes (default: one per CPU; 1 runs in-process).
+        chunk_size (int): The number of bytes per task.
+
+    Returns:
+        int: The number of bytes processed.
+
+    Raises:
+        ValueError: If the cipher or chunk size is invalid, or output_path is the input file.
+    """
+    if cipher not in SCRIPTS:
+        raise ValueError(f"Unknown cipher {cipher!r}; choose from {', '.join(SCRIPTS)}.")
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be positive.")
+    make_transform(cipher, key, encrypt)
+    # Opening the output truncates it, which would destroy the input if both were the same file.
+    if os.path.exists(output_path) and os.path.samefile(input_path, output_path):
+        raise ValueError("The output file must be different from the input file.")
+    size = os.path.getsize(input_path)
+    with open(output_path, "wb") as f:
+        f.truncate(size)
+    if size == 0:
+        return 0
+    starts = range(0, size, chunk_size)
+    ends = [min(start + chunk_size, size) for start in starts]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(starts) == 1:
+        _init_worker(input_path, output_path, cipher, key, encrypt)
+        return sum(map(_process_chunk, starts, ends))
+    with ProcessPoolExecutor(max_workers=min(workers, len(starts)), initializer=_init_worker,
+                             initargs=(input_path, output_path, cipher, key, encrypt)) as executor:
+        return sum(executor.map(_process_chunk, starts, ends))
+
+
+def benchmark(size=256 << 20, chunk_size=DEFAULT_CHUNK_SIZE, workers_list=None, ciphers=None):
+    """
+    Prints the throughput in MB/s of encrypt_file() for every cipher and number of worker processes.
+    """
+    if workers_list is None:
+        workers_list = sorted({1, 2, 4, os.cpu_count() or 1})
+    keys = {"caesar": "3", "affine": "5,8", "vigenere": "LEMON"}
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, "input.bin")
+        output_path = os.path.join(directory, "output.bin")
+        with open(input_path, "wb") as f:
+            for _ in range(0, size, 1 << 20):
+                f.write(os.urandom(1 << 20))
+        print(f"{size / 1e6:.0f} MB file, chunks of {chunk_size:,} bytes")
+        for cipher in ciphers or SCRIPTS:
+            for workers in workers_list:
+                start = time.perf_counter()
+                processed = encrypt_file(input_path, output_path, cipher, keys[cipher], True, workers, chunk_size)
+                elapsed = time.perf_counter() - start
+                print(f"  {cipher:<9} {workers:>3} worker(s): {processed / elapsed / 1e6:10.1f} MB/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encrypt or decrypt a file of any size with a substitution cipher "
+                                                 "on all cores, through memory-mapped input and output files.")
+    parser.add_argument("cipher", choices=SCRIPTS)
+    parser.add_argument("input", nargs="?", help="file to read")
+    parser.add_argument("output", nargs="?", help="file to write")
+    parser.add_argument("-k", "--key", help="the shift for caesar, a,b for affine, the keyword for vigenere")
+    parser.add_argument("-d", "--decrypt", action="store_true", help="decrypt instead of encrypt")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="bytes per task (default: 16 MiB)")
+    parser.add_argument("--benchmark", action="store_true", help="report MB/s for 1, 2, 4 and all cores")
+    parser.add_argument("--size", type=int, default=256 << 20, help="benchmark file size in bytes")
+    args = parser.parse_intermixed_args(argv)
+
+    if args.benchmark:
+        benchmark(args.size, args.chunk_size, ciphers=[args.cipher])
+        return 0
+    if not (args.input and args.output and args.key):
+        parser.error("the input file, the output file and --key are required")
+    start = time.perf_counter()
+    try:
+        processed = encrypt_file(args.input, args.output, args.cipher, args.key, not args.decrypt, args.workers,
+                                 args.chunk_size)
+    except ValueError as error:
+        parser.error(str(error))
+    elapsed = time.perf_counter() - start
+    print(f"{processed:,} bytes in {elapsed:.2f}s ({processed / max(elapsed, 1e-9) / 1e6:.1f} MB/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+A memory-mapped, multi-process file pipeline for the substitution ciphers (Caesar, Affine and the Vigenère Keyword
+method), for files larger than memory.
+
+1. The output file is truncated to the input size before any work starts, so every chunk has a fixed place to go.
+2. The file is split into chunks at fixed offsets. Caesar and Affine map every byte independently, and the Vigenère
+   Keyword method uses key letter offset % len(key) for the byte at offset, so each chunk can be encrypted on its
+   own by starting a VigenereStream at its offset.
+3. For every chunk, a worker memory-maps the input (read-only) and the output (writable) in with blocks, and flushes
+   the output map before both are unmapped. Tasks are just (start, end) pairs, so no file data is pickled or sent
+   between processes, and the operating system pages the files in and out as needed.
+4. Workers go through their chunks in blocks of BLOCK_SIZE bytes: Caesar and Affine translate each block with their
+   256-entry byte table, Vigenère with VigenereStream.update_into() (NumPy-backed when available), writing straight
+   from the input map into the output map. No temporary is ever larger than one tile (buffers.TILE_SIZE, 64 KiB).
+5. The work is split into many more chunks than workers, so throughput scales with the number of cores until the
+   disk or memory bandwidth is saturated.
+
+Examples:
+
+    python file_pipeline.py vigenere -k LEMON big.log big.enc -j 8
+    python file_pipeline.py vigenere -k LEMON -d big.enc big.dec
+    python file_pipeline.py caesar --benchmark --size 1073741824
+"""
@@ -0,0 +1,151 @@
+import argparse
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from script_loader import load_script
+
+keyless = load_script("TranspositionCipher_Keyless-Transposition-Cipher.py")
+
+DEFAULT_BLOCK_SIZE = keyless.DEFAULT_BLOCK_SIZE
+
+
+def _transpose_block(block, encrypt):
+    return keyless.keyless_transposition_cipher(block, encrypt)
+
+
+def parallel_blocks(source, encrypt=True, block_size=DEFAULT_BLOCK_SIZE, workers=None, window=None):
+    """
+    Yields the same blocks as keyless_transposition_blocks(), transposed on a process pool.
+
+    Blocks are read and submitted ahead of the consumer, but never more than window at a time, so memory stays
+    bounded however large the input is. Results are yielded in input order.
+
+    Args:
+        source: A readable file object (text or binary).
+        encrypt (bool): True to encrypt, False to decrypt.
+        block_size (int): The number of characters or bytes per block.
+        workers (int): The number of worker processes (default: one per CPU; 1 runs in-process).
+        window (int): The largest number of blocks in flight (default: twice the number of workers).
+
+    Yields:
+        str or bytes: The transposed blocks, in order.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from keyless.keyless_transposition_blocks(source, encrypt, block_size)
+        return
+    if block_size < 1:
+        raise ValueError("The block size must be positive.")
+    window = window or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        while True:
+            while len(in_flight) < window:
+                block = source.read(block_size)
+                if not block:
+                    break
+                in_flight.append(executor.submit(_transpose_block, block, encrypt))
+            if not in_flight:
+                break
+            yield in_flight.popleft().result()
+
+
+def parallel_stream(source, sink, encrypt=True, block_size=DEFAULT_BLOCK_SIZE, workers=None, window=None):
+    """
+    Encrypts or decrypts a stream in fixed-size blocks on a process pool and writes the result to sink.
+
+    The output is identical to keyless_transposition_stream() with the same block size.
+
+    Returns:
+        int: The number of characters or bytes processed.
+    """
+    total = 0
+    for block in parallel_blocks(source, encrypt, block_size, workers, window):
+        sink.write(block)
+        total += len(block)
+    sink.flush()
+    return total
+
+
+def benchmark(size=64 << 20, block_size=DEFAULT_BLOCK_SIZE, workers_list=None):
+    """
+    Prints the encryption throughput in MB/s of binary data for increasing numbers of worker processes.
+    """
+    if workers_list is None:
+        workers_list = sorted({1, 2, 4, os.cpu_count() or 1})
+    data = os.urandom(size)
+    expected = None
+    print(f"{size / 1e6:.0f} MB in blocks of {block_size:,} bytes, "
+          f"{'numpy' if keyless.np is not None else 'pure python'} transposition")
+    for workers in workers_list:
+        sink = io.BytesIO()
+        start = time.perf_counter()
+        parallel_stream(io.BytesIO(data), sink, True, block_size, workers)
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            expected = sink.getvalue()
+        assert sink.getvalue() == expected, f"{workers} workers produced different output"
+        print(f"  {workers:>3} worker(s): {size / elapsed / 1e6:10.1f} MB/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encrypt or decrypt with the Keyless Transposition Cipher in "
+                                                 "fixed-size blocks spread over a process pool.")
+    parser.add_argument("input", nargs="?", help="input file (default: stdin)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("-d", "--decrypt", action="store_true", help="decrypt instead of encrypt")
+    parser.add_argument("-b", "--binary", action="store_true", help="transpose raw bytes instead of characters")
+    parser.add_argument("--encoding", default="utf-8", help="text encoding (default: utf-8)")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--window", type=int, default=None, help="blocks in flight (default: 2 per worker)")
+    parser.add_argument("--benchmark", action="store_true", help="report MB/s for 1, 2, 4 and all cores")
+    parser.add_argument("--size", type=int, default=64 << 20, help="benchmark input size in bytes")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark(args.size, args.block_size)
+        return 0
+    source = open(args.input, "rb") if args.input else sys.stdin.buffer
+    sink = open(args.output, "wb") if args.output else sys.stdout.buffer
+    if not args.binary:
+        source = io.TextIOWrapper(source, encoding=args.encoding, newline="")
+        sink = io.TextIOWrapper(sink, encoding=args.encoding, newline="")
+    try:
+        parallel_stream(source, sink, not args.decrypt, args.block_size, args.workers, args.window)
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            sink.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+Block mode for TranspositionCipher_Keyless-Transposition-Cipher.py.
+
+The original cipher builds one grid of about sqrt(n) x sqrt(n) for the whole input, which needs the whole input in
+memory and cannot be split up. In block mode every block_size characters (or bytes) form their own grid, so each block
+can be transposed by a different process:
+
+1. The main process reads blocks and submits them to a ProcessPoolExecutor, keeping at most window blocks in flight
+   in a deque. The oldest future is always the next one to write, so the output comes out in input order and the
+   reader never runs more than window blocks ahead of the writer.
+2. Workers only run keyless_transposition_cipher() on the block they are given; with workers=1 everything runs in the
+   calling process via keyless_transposition_blocks(), which produces exactly the same output.
+3. Only the final block can be shorter than block_size, and it is decrypted with the same grid it was encrypted with,
+   so ciphertext must be decrypted with the block size it was encrypted with.
+
+Examples:
+
+    python keyless_block_cipher.py big.bin -b -o big.enc -j 8
+    python keyless_block_cipher.py big.enc -b -d -o big.bin -j 8
+    python keyless_block_cipher.py --benchmark --size 268435456
+"""
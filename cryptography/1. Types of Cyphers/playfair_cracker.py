@@ -0,0 +1,410 @@
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from array import array
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from script_loader import load_script
+
+ALPHABET = "ABCDEFGHIKLMNOPQRSTUVWXYZ"
+
+CrackResult = namedtuple("CrackResult", ["score", "key", "plaintext", "restart", "evaluations"])
+
+
+class QuadgramScorer:
+    """
+    Log10 probabilities of English quadgrams, stored in a flat 26 ** 4 array indexed by
+    a * 17576 + b * 676 + c * 26 + d.
+
+    Unseen quadgrams get a floor probability of 0.01 / total.
+    """
+
+    def __init__(self, counts):
+        total = sum(counts.values())
+        if not total:
+            raise ValueError("No quadgrams to build the scorer from.")
+        floor = math.log10(0.01 / total)
+        table = array("d", [floor]) * (26 ** 4)
+        expected = 0.0
+        for quadgram, count in counts.items():
+            a, b, c, d = (ord(char) - 65 for char in quadgram)
+            probability = count / total
+            table[a * 17576 + b * 676 + c * 26 + d] = math.log10(probability)
+            expected += probability * math.log10(probability)
+        self.table = np.frombuffer(table, dtype=np.float64) if np is not None else table
+        # The average score per quadgram of typical English text.
+        self.expected = expected
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads quadgram counts from a file with one "TION 13168375" (or "TION,13168375") line per quadgram.
+        """
+        counts = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.replace(",", " ").split()
+                if len(parts) == 2 and len(parts[0]) == 4 and parts[0].isalpha() and parts[0].isascii():
+                    counts[parts[0].upper()] = counts.get(parts[0].upper(), 0) + int(parts[1])
+        return cls(counts)
+
+    @classmethod
+    def from_text(cls, text):
+        """
+        Counts the quadgrams of a training text.
+        """
+        letters = "".join(char for char in text.upper() if "A" <= char <= "Z")
+        counts = {}
+        for i in range(len(letters) - 3):
+            quadgram = letters[i:i + 4]
+            counts[quadgram] = counts.get(quadgram, 0) + 1
+        return cls(counts)
+
+
+def _decrypt_positions():
+    """
+    Returns, for the grid positions (pa, pb) of a ciphertext digraph at index pa * 25 + pb, the grid
+    positions of the plaintext digraph. Unlike the letters, these do not depend on the key.
+    """
+    first, second = [], []
+    for pa in range(25):
+        for pb in range(25):
+            (ra, ca), (rb, cb) = divmod(pa, 5), divmod(pb, 5)
+            if ra == rb:
+                first.append(ra * 5 + (ca - 1) % 5)
+                second.append(rb * 5 + (cb - 1) % 5)
+            elif ca == cb:
+                first.append(((ra - 1) % 5) * 5 + ca)
+                second.append(((rb - 1) % 5) * 5 + cb)
+            else:
+                first.append(ra * 5 + cb)
+                second.append(rb * 5 + ca)
+    return first, second
+
+
+_DECRYPT_FIRST, _DECRYPT_SECOND = _decrypt_positions()
+_TO_26 = [ord(char) - 65 for char in ALPHABET]
+_PAIR_POSITIONS = [(pa, pb) for pa in range(25) for pb in range(25)]
+if np is not None:
+    _DECRYPT_FIRST = np.array(_DECRYPT_FIRST, dtype=np.intp)
+    _DECRYPT_SECOND = np.array(_DECRYPT_SECOND, dtype=np.intp)
+    _TO_26 = np.array(_TO_26, dtype=np.intp)
+    _PAIR_FIRST = np.repeat(np.arange(25), 25)
+    _PAIR_SECOND = np.tile(np.arange(25), 25)
+
+
+def prepare_ciphertext(text):
+    """
+    Returns the ciphertext letters as indices into ALPHABET (J counted as I), padded to an even length.
+    """
+    letters = [ALPHABET.index(char) for char in text.upper().replace("J", "I") if char in ALPHABET]
+    if len(letters) % 2:
+        letters.append(ALPHABET.index("X"))
+    return letters
+
+
+class PlayfairFitness:
+    """
+    Scores candidate 5x5 key squares by the quadgram log probability of the text they decrypt to.
+
+    The ciphertext is stored as digraph codes (first * 25 + second). For a candidate grid the decryption of
+    all 625 possible digraphs is computed first, so decrypting the text is a single gather per letter.
+    """
+
+    def __init__(self, ciphertext, scorer):
+        letters = prepare_ciphertext(ciphertext)
+        if len(letters) < 4:
+            raise ValueError("The ciphertext is too short to score.")
+        self.length = len(letters)
+        self.table = scorer.table
+        codes = [letters[i] * 25 + letters[i + 1] for i in range(0, len(letters), 2)]
+        self.codes = np.array(codes, dtype=np.intp) if np is not None else codes
+        self.evaluations = 0
+
+    def decrypt(self, grid):
+        """
+        Decrypts the ciphertext with a grid (a sequence of 25 ALPHABET indices), returning 0-25 letter codes.
+        """
+        if np is not None:
+            grid = np.asarray(grid, dtype=np.intp)
+            position = np.empty(25, dtype=np.intp)
+            position[grid] = np.arange(25)
+            digraphs = position[_PAIR_FIRST] * 25 + position[_PAIR_SECOND]
+            first = _TO_26[grid[_DECRYPT_FIRST[digraphs]]]
+            second = _TO_26[grid[_DECRYPT_SECOND[digraphs]]]
+            plaintext = np.empty(self.length, dtype=np.intp)
+            plaintext[0::2] = first[self.codes]
+            plaintext[1::2] = second[self.codes]
+            return plaintext
+        position = [0] * 25
+        for i, letter in enumerate(grid):
+            position[letter] = i
+        first = [0] * 625
+        second = [0] * 625
+        for i, (pa, pb) in enumerate(_PAIR_POSITIONS):
+            code = position[pa] * 25 + position[pb]
+            first[i] = _TO_26[grid[_DECRYPT_FIRST[code]]]
+            second[i] = _TO_26[grid[_DECRYPT_SECOND[code]]]
+        plaintext = []
+        for code in self.codes:
+            plaintext.append(first[code])
+            plaintext.append(second[code])
+        return plaintext
+
+    def __call__(self, grid):
+        self.evaluations += 1
+        p = self.decrypt(grid)
+        if np is not None:
+            return float(self.table[p[:-3] * 17576 + p[1:-2] * 676 + p[2:-1] * 26 + p[3:]].sum())
+        table = self.table
+        return sum(table[p[i] * 17576 + p[i + 1] * 676 + p[i + 2] * 26 + p[i + 3]] for i in range(len(p) - 3))
+
+
+def grid_to_key(grid):
+    """
+    Converts a grid of ALPHABET indices into the 25-letter key that generate_grid() turns back into it.
+    """
+    return "".join(ALPHABET[i] for i in grid)
+
+
+def mutate(grid, rng):
+    """
+    Returns a slightly changed copy of a grid: mostly a swap of two letters, sometimes a row, column or
+    whole-square rearrangement.
+    """
+    grid = list(grid)
+    choice = rng.random()
+    if choice < 0.9:
+        i, j = rng.sample(range(25), 2)
+        grid[i], grid[j] = grid[j], grid[i]
+        return grid
+    rows = [grid[r * 5:r * 5 + 5] for r in range(5)]
+    if choice < 0.92:
+        a, b = rng.sample(range(5), 2)
+        rows[a], rows[b] = rows[b], rows[a]
+    elif choice < 0.94:
+        a, b = rng.sample(range(5), 2)
+        for row in rows:
+            row[a], row[b] = row[b], row[a]
+    elif choice < 0.96:
+        rows.reverse()
+    elif choice < 0.98:
+        for row in rows:
+            row.reverse()
+    else:
+        return grid[::-1]
+    return [letter for row in rows for letter in row]
+
+
+def anneal(fitness, seed, temperature=None, cooling=0.2, iterations=5000, stop_event=None, start_key=None):
+    """
+    Runs one simulated annealing search over key squares.
+
+    Args:
+        fitness (PlayfairFitness): The scoring function.
+        seed (int): Seed of this restart's random number generator.
+        temperature (float): The starting temperature (default: scaled to the ciphertext length).
+        cooling (float): The amount the temperature drops after each round.
+        iterations (int): The number of candidate keys tried per temperature.
+        stop_event: Optional event; the search returns its best key as soon as it is set.
+        start_key (str): Optional key to start from instead of a random square.
+
+    Returns:
+        tuple: The best score (float) and grid (list of ALPHABET indices).
+    """
+    rng = random.Random(seed)
+    if start_key is not None:
+        grid = [ALPHABET.index(char) for row in _generate_grid(start_key) for char in row]
+    else:
+        grid = list(range(25))
+        rng.shuffle(grid)
+    if temperature is None:
+        temperature = 10 + 0.087 * (fitness.length - 84)
+    temperature = max(temperature, cooling)
+    score = fitness(grid)
+    best_score, best_grid = score, grid
+    while temperature > 0:
+        if stop_event is not None and stop_event.is_set():
+            break
+        for _ in range(iterations):
+            child = mutate(grid, rng)
+            child_score = fitness(child)
+            delta = child_score - score
+            if delta >= 0 or rng.random() < math.exp(delta / temperature):
+                grid, score = child, child_score
+                if score > best_score:
+                    best_score, best_grid = score, grid
+        temperature -= cooling
+    return best_score, best_grid
+
+
+def _generate_grid(key):
+    playfair = load_script("Playfair-cypher.py")
+    return playfair.generate_grid(playfair.prepare_key(key))
+
+
+# Set in every worker process by _init_worker().
+_FITNESS = None
+_STOP = None
+
+
+def _init_worker(ciphertext, scorer, stop_event):
+    global _FITNESS, _STOP
+    _FITNESS = PlayfairFitness(ciphertext, scorer)
+    _STOP = stop_event
+
+
+def _anneal_job(restart, options):
+    _FITNESS.evaluations = 0
+    score, grid = anneal(_FITNESS, restart, stop_event=_STOP, **options)
+    return restart, score, grid, _FITNESS.evaluations
+
+
+def crack(ciphertext, scorer, restarts=8, workers=None, target=None, seed=0, **options):
+    """
+    Recovers a Playfair key with independent simulated annealing restarts spread over a process pool.
+
+    Args:
+        ciphertext (str): The ciphertext.
+        scorer (QuadgramScorer): English quadgram statistics.
+        restarts (int): The number of independent restarts.
+        workers (int): The number of worker processes (default: one per CPU).
+        target (float): Stop all restarts once one reaches this average log10 score per quadgram
+            (default: 1.15 times the expected English score; float("inf") runs every restart).
+        seed (int): Base random seed; restart i uses seed + i.
+        **options: Passed on to anneal() (temperature, cooling, iterations, start_key).
+
+    Returns:
+        CrackResult: The best key found, its plaintext and search statistics.
+    """
+    if target is None:
+        target = scorer.expected * 1.15
+    quadgrams = len(prepare_ciphertext(ciphertext)) - 3
+    best = None
+    evaluations = 0
+    # The manager's server process holds the shared stop event; leaving the block shuts it down.
+    with multiprocessing.Manager() as manager:
+        stop_event = manager.Event()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(ciphertext, scorer, stop_event)) as executor:
+            pending = {executor.submit(_anneal_job, seed + i, options) for i in range(restarts)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    restart, score, grid, count = future.result()
+                    evaluations += count
+                    if best is None or score > best[1]:
+                        best = (restart, score, grid)
+                if best[1] / quadgrams >= target:
+                    stop_event.set()
+                    for future in pending:
+                        future.cancel()
+    restart, score, grid = best
+    key = grid_to_key(grid)
+    plaintext = load_script("Playfair-cypher.py").playfair_cipher(ciphertext, key, encrypt=False)
+    return CrackResult(score / quadgrams, key, plaintext, restart - seed, evaluations)
+
+
+def _benchmark_job(seconds):
+    start = time.perf_counter()
+    _FITNESS.evaluations = 0
+    rng = random.Random(os.getpid())
+    grid = list(range(25))
+    while time.perf_counter() - start < seconds:
+        for _ in range(1000):
+            grid = mutate(grid, rng)
+            _FITNESS(grid)
+    return _FITNESS.evaluations, time.perf_counter() - start
+
+
+def benchmark(scorer, length=300, seconds=3.0, workers_list=None):
+    """
+    Prints the number of candidate keys evaluated per second for increasing numbers of worker processes.
+    """
+    sample = " ".join(["the war of the worlds was written by herbert george wells and first published"] * 20)
+    ciphertext = load_script("Playfair-cypher.py").playfair_cipher(sample[:length], "MONARCHY")
+    if workers_list is None:
+        workers_list = sorted({1, 2, 4, os.cpu_count() or 1})
+    print(f"ciphertext of {len(prepare_ciphertext(ciphertext))} letters, "
+          f"{'numpy' if np is not None else 'pure python'} scoring")
+    for workers in workers_list:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(ciphertext, scorer, None)) as executor:
+            results = list(executor.map(_benchmark_job, [seconds] * workers))
+        rate = sum(count / elapsed for count, elapsed in results)
+        print(f"  {workers:>3} worker(s): {rate:12,.0f} keys/s  {rate / workers:12,.0f} keys/s/worker")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recover a Playfair key by simulated annealing.")
+    parser.add_argument("input", nargs="?", help="ciphertext file (default: stdin)")
+    stats = parser.add_mutually_exclusive_group(required=True)
+    stats.add_argument("-q", "--quadgrams", help="file of English quadgram counts (\"TION 13168375\" per line)")
+    stats.add_argument("-c", "--corpus", help="English text to count quadgrams from")
+    parser.add_argument("-r", "--restarts", type=int, default=8)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("-i", "--iterations", type=int, default=5000, help="keys tried per temperature")
+    parser.add_argument("--temperature", type=float, default=None)
+    parser.add_argument("--cooling", type=float, default=0.2)
+    parser.add_argument("--target", type=float, default=None,
+                        help="average log10 score per quadgram at which to stop early")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--benchmark", action="store_true", help="report keys evaluated per second")
+    args = parser.parse_args(argv)
+
+    if args.quadgrams:
+        scorer = QuadgramScorer.from_file(args.quadgrams)
+    else:
+        with open(args.corpus, encoding="utf-8") as f:
+            scorer = QuadgramScorer.from_text(f.read())
+    if args.benchmark:
+        benchmark(scorer)
+        return 0
+    if args.input:
+        with open(args.input, encoding="utf-8") as f:
+            ciphertext = f.read()
+    else:
+        ciphertext = sys.stdin.read()
+    start = time.perf_counter()
+    result = crack(ciphertext, scorer, args.restarts, args.workers, args.target, args.seed,
+                   temperature=args.temperature, cooling=args.cooling, iterations=args.iterations)
+    elapsed = time.perf_counter() - start
+    print(f"key: {result.key}  score/quadgram: {result.score:.3f}  restart: {result.restart}", file=sys.stderr)
+    print(f"{result.evaluations:,} keys in {elapsed:.1f}s ({result.evaluations / elapsed:,.0f} keys/s)",
+          file=sys.stderr)
+    print(result.plaintext)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+The key aspects of this Playfair cracker are:
+
+1. QuadgramScorer keeps the log10 probability of every English quadgram in a flat 26 ** 4 array, so scoring a text
+   is one gather and a sum.
+2. Playfair decryption only depends on the grid positions of the two letters, so the plaintext positions for all
+   625 position pairs are computed once. For a candidate grid, PlayfairFitness turns that into a 625-entry digraph
+   table and decrypts the whole ciphertext with a single gather per letter.
+3. anneal() performs simulated annealing over key squares: mostly swapping two letters, sometimes swapping or
+   reversing rows and columns. Worse keys are accepted with probability exp(delta / temperature).
+4. crack() runs independent restarts in a process pool. As soon as one reaches the target score per quadgram it
+   sets a shared event, the running restarts return early and the rest are cancelled. The best square is turned
+   into a key for generate_grid() and the plaintext comes from playfair_cipher() in Playfair-cypher.py.
+
+Example:
+
+    python playfair_cracker.py intercepted.txt --quadgrams english_quadgrams.txt --restarts 16
+    python playfair_cracker.py --quadgrams english_quadgrams.txt --benchmark
+"""
@@ -0,0 +1,35 @@
+import importlib.util
+import os
+import re
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(filename):
+    """
+    Imports one of the cipher scripts in this folder by file name.
+
+    The scripts have spaces and dashes in their names, so they cannot be imported with a plain
+    import statement. Each script is loaded once and registered in sys.modules under a name made
+    from its file name (e.g. "Caesar-cypher.py" -> "Caesar_cypher").
+
+    Args:
+        filename (str): The file name, relative to this folder (shared modules elsewhere in the repository, such as
+            ../2. Public Key Cryptography/number_theory.py, are loaded the same way).
+
+    Returns:
+        module: The loaded module.
+    """
+    name = re.sub(r"\W", "_", os.path.splitext(os.path.basename(filename))[0])
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
@@ -0,0 +1,125 @@
+import argparse
+import random
+import sys
+import time
+
+from script_loader import load_script
+
+DEFAULT_SIZES = "1K,10K,100K,1M,10M,100M"
+KEY = "LEMONADE"
+
+
+def parse_size(text):
+    """
+    Parses a size such as "512", "64K", "10M" or "1G" into a number of bytes.
+    """
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    text = text.strip().upper()
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def format_size(size):
+    for unit, factor in (("G", 1 << 30), ("M", 1 << 20), ("K", 1 << 10)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return str(size)
+
+
+def sample_text(size, seed=0):
+    """
+    Returns size characters of ASCII text with English-like letters, spaces and punctuation.
+    """
+    rng = random.Random(seed)
+    words = ("the of and to in is was that for it with as his on be at by had are but from or have an "
+             "they which one you were all her she there would their we him been has when who will more "
+             "no if out so said what up its about into than them can only other new some could time "
+             "these two may then do first any my now such like our over man me even most made after").split()
+    block = []
+    length = 0
+    while length < min(size, 1 << 16):
+        word = rng.choice(words)
+        if rng.random() < 0.1:
+            word = word.capitalize() + rng.choice(",.;")
+        block.append(word)
+        length += len(word) + 1
+    block = " ".join(block)
+    return (block * (size // len(block) + 1))[:size]
+
+
+def implementations():
+    """
+    Returns (name, module, encrypt/decrypt function) for every implementation, with and without NumPy.
+    """
+    keyword = load_script("VigenereCipher_Keyword-Method.py")
+    table = load_script("VigenereCipher_Vigenere-Table-Method.py")
+    result = []
+    for name, module in (("keyword", keyword), ("table", table)):
+        if module.np is not None:
+            result.append((f"{name} (numpy)", module, module.np))
+        result.append((f"{name} (pure python)", module, None))
+    return result
+
+
+def measure(function, text, key, encrypt, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = function(text, key, encrypt)
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+
+def benchmark(sizes, repeat=3, max_python_size=10 << 20):
+    """
+    Prints encryption and decryption throughput of both Vigenère implementations for each input size.
+
+    Pure Python paths are skipped above max_python_size, where they would dominate the run time.
+    """
+    print(f"{'size':>6}  {'implementation':<22}{'encrypt MB/s':>14}{'decrypt MB/s':>14}")
+    for size in sizes:
+        text = sample_text(size)
+        repeats = repeat if size <= (1 << 20) else 1
+        for name, module, backend in implementations():
+            if backend is None and size > max_python_size:
+                continue
+            saved, module.np = module.np, backend
+            try:
+                enc_time, ciphertext = measure(module.vigenere_cipher, text, KEY, True, repeats)
+                dec_time, plaintext = measure(module.vigenere_cipher, ciphertext, KEY, False, repeats)
+            finally:
+                module.np = saved
+            assert plaintext == text.upper(), f"{name} did not round-trip"
+            print(f"{format_size(size):>6}  {name:<22}"
+                  f"{size / enc_time / 1e6:>14.1f}{size / dec_time / 1e6:>14.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the two Vigenère implementations.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"comma-separated input sizes (default: {DEFAULT_SIZES})")
+    parser.add_argument("--repeat", type=int, default=3, help="best-of repeats for inputs up to 1M")
+    parser.add_argument("--max-python-size", default="10M",
+                        help="largest input to run the pure Python paths on (default: 10M)")
+    args = parser.parse_args(argv)
+    benchmark([parse_size(size) for size in args.sizes.split(",")], args.repeat,
+              parse_size(args.max_python_size))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+This benchmark compares the Keyword method (VigenereCipher_Keyword-Method.py) and the Vigenère Table method
+(VigenereCipher_Vigenere-Table-Method.py) on ASCII text from 1 KB to 100 MB, with and without NumPy.
+
+Both scripts are loaded with script_loader.load_script(), and the NumPy path of each one is switched off by setting
+its module-level np to None for the "pure python" rows. Every run checks that decryption gives back the upper-cased
+input before reporting a number.
+
+Example:
+
+    python vigenere_benchmark.py --sizes 1K,1M,100M
+"""
@@ -1,10 +1,9 @@
 # Diffie-Hellman Code
 # Power function to return value of a^b mod P
 def power(a, b, p):
- if b == 1:
-    return a
- else:
-    return pow(a, b) % p
+ # Three-argument pow reduces modulo p after every step, so the intermediate numbers never grow
+ # beyond p ** 2, whereas pow(a, b) % p would build the full a ** b first.
+ return pow(a, b, p)
 # Main function
 def main():
  # Both persons agree upon the public keys G and P
@@ -37,7 +36,7 @@ if __name__ == "__main__":
  """
  
 1. The `power()` function is a helper function that calculates the value of `a^b mod P` efficiently using the 
-`pow()` function.
+three-argument `pow()` function, which reduces modulo `P` at every step.
 2. The `main()` function is the main entry point of the program.
 3. Inside the `main()` function:
    - The public parameters `P` (a prime number) and `G` (a primitive root modulo `P`) are defined.
@@ -1,19 +1,4 @@
-# Function to calculate gcd and extended gcd to find modular inverse
-def extended_gcd(a, b):
-    if a == 0:
-        return b, 0, 1
-    gcd, x1, y1 = extended_gcd(b % a, a)
-    x = y1 - (b // a) * x1
-    y = x1
-    return gcd, x, y
-
-# Function to find modular inverse of e mod phi
-def mod_inverse(e, phi):
-    gcd, x, y = extended_gcd(e, phi)
-    if gcd != 1:
-        raise ValueError("Modular inverse does not exist for these values.")
-    else:
-        return x % phi
+from number_theory import gcd, mod_inverse
 
 # Given values
 p = 7
@@ -24,7 +9,7 @@ phi = (p - 1) * (q - 1)  # Calculate Euler's Totient function, phi
 # Choose e such that 1 < e < phi and gcd(e, phi) == 1
 e = 2
 while e < phi:
-    if extended_gcd(e, phi)[0] == 1:
+    if gcd(e, phi) == 1:
         break
     else:
         e += 1
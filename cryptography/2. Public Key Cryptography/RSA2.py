@@ -1,15 +1,4 @@
-# Function to calculate gcd
-def gcd(a, b):
-    while b != 0:
-        a, b = b, a % b
-    return a
-
-# Function to find modular inverse of e mod phi
-def find_d(e, phi):
-    d = 1
-    while (d * e) % phi != 1:
-        d += 1
-    return d
+from number_theory import gcd, mod_inverse
 
 # Given values
 p = 13
@@ -25,7 +14,7 @@ if gcd(e, phi) != 1:
     raise ValueError("e and phi are not co-prime. Choose a different e.")
 
 # Find d, the modular inverse of e
-d = find_d(e, phi)
+d = mod_inverse(e, phi)
 
 print("Public key (e, n):", (e, n))
 print("Private key (d, n):", (d, n))
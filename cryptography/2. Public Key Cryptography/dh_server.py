@@ -0,0 +1,402 @@
+import argparse
+import asyncio
+import hashlib
+import hmac
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dh_precompute import DEFAULT_CACHE_DIR, DEFAULT_WINDOW, cached_table, generate_keypair, modp_group, shared_secret
+
+DEFAULT_PORT = 8765
+DEFAULT_POOL_SIZE = 256
+# Key pairs are generated in batches, so one round trip to a worker process yields many keys.
+BATCH_SIZE = 16
+TIMEOUT = 30
+
+# Set in every worker process by _init_worker().
+_GROUP = None
+_TABLE = None
+
+
+def _init_worker(bits, window, cache_dir):
+    global _GROUP, _TABLE
+    _GROUP = modp_group(bits)
+    _TABLE = cached_table(_GROUP, window, cache_dir)
+
+
+def _generate_batch(count):
+    return [generate_keypair(_GROUP, _TABLE) for _ in range(count)]
+
+
+def session_key(secret, group):
+    """
+    Derives a 32-byte session key from a shared secret (its SHA-256, as a fixed-length big-endian number).
+    """
+    return hashlib.sha256(secret.to_bytes((group.p.bit_length() + 7) // 8, "big")).digest()
+
+
+def confirmation(key, client_public, server_public):
+    """
+    Returns the tag the server sends to prove it derived the same session key as the client.
+    """
+    return hmac.new(key, f"{client_public:x}:{server_public:x}".encode(), hashlib.sha256).hexdigest()
+
+
+def _agree(private, public, peer_public):
+    """
+    Computes the shared secret and the confirmation tag in a worker process.
+    """
+    key = session_key(shared_secret(_GROUP, private, peer_public), _GROUP)
+    return confirmation(key, peer_public, public)
+
+
+class KeyPool:
+    """
+    A queue of pre-generated ephemeral key pairs, refilled in the background on a process pool.
+
+    The refill tasks share the executor with the request path, which serves tasks in submission order, so each
+    one keeps a single batch of key pairs in the executor at a time, sleeping while the queue is full. With fewer
+    producers than workers, at least one worker is always free for key agreements; a request never queues behind
+    more than producers batches. If a refill task fails, take() raises instead of waiting forever.
+    """
+
+    def __init__(self, executor, size=DEFAULT_POOL_SIZE, producers=1):
+        self._executor = executor
+        self._queue = asyncio.Queue(maxsize=size)
+        self._tasks = [asyncio.create_task(self._refill()) for _ in range(producers)]
+        self.misses = 0
+
+    async def _refill(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            for pair in await loop.run_in_executor(self._executor, _generate_batch, BATCH_SIZE):
+                await self._queue.put(pair)
+
+    def _raise_if_failed(self):
+        for task in self._tasks:
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise RuntimeError("Key pair generation failed.") from task.exception()
+
+    async def take(self):
+        """
+        Returns a key pair, waiting for the refill tasks if the pool has run dry.
+
+        Raises:
+            RuntimeError: If a refill task has failed and the pool is empty.
+        """
+        if not self._queue.empty():
+            return self._queue.get_nowait()
+        self.misses += 1
+        self._raise_if_failed()
+        getter = asyncio.ensure_future(self._queue.get())
+        # Wait for a key pair or for a refill task to stop, whichever comes first.
+        await asyncio.wait([getter, *self._tasks], return_when=asyncio.FIRST_COMPLETED)
+        if not getter.done():
+            getter.cancel()
+            self._raise_if_failed()
+        return await getter
+
+    async def wait_full(self):
+        """
+        Waits until the pool is full, raising RuntimeError if a refill task fails first.
+        """
+        while self._queue.qsize() < self._queue.maxsize:
+            self._raise_if_failed()
+            await asyncio.sleep(0.1)
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class DHServer:
+    """
+    A TCP server that performs ephemeral Diffie-Hellman key agreements in an RFC 3526 group.
+
+    The protocol is line based. The client sends "DH <bits> <public key in hex>" and the server answers
+    "<its public key in hex> <confirmation tag>", or "ERR <reason>". A connection may run any number of key
+    agreements, one per line.
+
+    The server uses at least two worker processes, so that one is always left for key agreements while the others
+    refill the key pool.
+    """
+
+    def __init__(self, bits=2048, workers=None, pool_size=DEFAULT_POOL_SIZE, window=DEFAULT_WINDOW,
+                 cache_dir=DEFAULT_CACHE_DIR):
+        self.group = modp_group(bits)
+        self.workers = max(2, workers or os.cpu_count() or 1)
+        self.pool_size = pool_size
+        self._initargs = (bits, window, cache_dir)
+        self.handshakes = 0
+        self.errors = 0
+        self._executor = None
+        self._pool = None
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        # Build (or load) the table once here, so the workers find it in the disk cache.
+        _init_worker(*self._initargs)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=self._initargs)
+        # One producer less than the workers (of which there are at least two), so refilling never occupies every
+        # worker while requests are waiting.
+        self._pool = KeyPool(self._executor, self.pool_size, self.workers - 1)
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=4096)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        await self._pool.close()
+        self._executor.shutdown(cancel_futures=True)
+
+    async def _handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), TIMEOUT)
+                except ValueError:
+                    # readline() raises ValueError (LimitOverrunError) when a line exceeds the stream limit.
+                    self.errors += 1
+                    writer.write(b"ERR line too long\n")
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                try:
+                    command, bits, peer_public = line.decode("ascii").split()
+                    peer_public = int(peer_public, 16)
+                    if command != "DH" or int(bits) != self.group.p.bit_length():
+                        raise ValueError("unsupported request")
+                    if not 2 <= peer_public <= self.group.p - 2:
+                        raise ValueError("invalid public key")
+                except (UnicodeDecodeError, ValueError) as error:
+                    self.errors += 1
+                    writer.write(f"ERR {error}\n".encode())
+                    await writer.drain()
+                    break
+                # Only the shared secret is computed on the request path; the key pair was generated in advance.
+                try:
+                    private, public = await self._pool.take()
+                except RuntimeError:
+                    self.errors += 1
+                    writer.write(b"ERR key generation failed\n")
+                    await writer.drain()
+                    break
+                tag = await loop.run_in_executor(self._executor, _agree, private, public, peer_public)
+                writer.write(f"{public:x} {tag}\n".encode())
+                await writer.drain()
+                self.handshakes += 1
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def fill(self):
+        """
+        Waits until the key pool is full.
+        """
+        await self._pool.wait_full()
+
+    @property
+    def pooled(self):
+        """
+        The number of key pairs waiting in the pool.
+        """
+        return len(self._pool)
+
+    def stats(self):
+        return (f"{self.handshakes:,} handshakes, {self.errors:,} errors, {self.pooled}/{self.pool_size} keys "
+                f"pooled, {self._pool.misses:,} pool misses")
+
+
+async def serve(host="127.0.0.1", port=DEFAULT_PORT, bits=2048, workers=None, pool_size=DEFAULT_POOL_SIZE):
+    """
+    Runs a DHServer until it is interrupted, printing its statistics every ten seconds.
+    """
+    server = DHServer(bits, workers, pool_size)
+    port = await server.start(host, port)
+    print(f"Listening on {host}:{port}, {server.group.name}, {server.workers} worker(s)", file=sys.stderr)
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(server.stats(), file=sys.stderr)
+    finally:
+        await server.close()
+
+
+async def load_test(host="127.0.0.1", port=DEFAULT_PORT, bits=2048, concurrency=1000, total=10000, verify=False,
+                    workers=None):
+    """
+    Runs total key agreements against a server over concurrency simultaneous connections.
+
+    Every connection runs its share of the agreements one after another and measures each from sending the public
+    key to receiving the answer. The client's own key pairs are generated up front and reused, so the client spends
+    its time on the network and, with verify, on checking the server's confirmation tags on a process pool.
+
+    Returns:
+        dict: The number of handshakes and errors, the elapsed time, handshakes per second and the p50, p99 and
+            maximum latencies in seconds.
+    """
+    group = modp_group(bits)
+    table = cached_table(group)
+    keys = [generate_keypair(group, table) for _ in range(min(64, total))]
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(bits, DEFAULT_WINDOW, DEFAULT_CACHE_DIR)) if verify else None
+    loop = asyncio.get_running_loop()
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def client():
+        nonlocal errors
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            # The other connections take over this one's share of the agreements.
+            errors += 1
+            return
+        try:
+            for n in counter:
+                private, public = keys[n % len(keys)]
+                start = time.perf_counter()
+                writer.write(f"DH {bits} {public:x}\n".encode())
+                await writer.drain()
+                answer = (await reader.readline()).decode().split()
+                latencies.append(time.perf_counter() - start)
+                if len(answer) != 2 or answer[0] == "ERR":
+                    errors += 1
+                    continue
+                if verify:
+                    server_public = int(answer[0], 16)
+                    # The client side of the agreement: the same computation the server did, with the roles swapped.
+                    tag = await loop.run_in_executor(executor, _agree_client, private, server_public, public)
+                    if tag != answer[1]:
+                        errors += 1
+        except (ConnectionError, ValueError):
+            errors += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+    finally:
+        if executor:
+            executor.shutdown()
+    elapsed = time.perf_counter() - start
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {"handshakes": len(latencies), "errors": errors, "elapsed": elapsed,
+            "rate": len(latencies) / elapsed, "p50": percentiles[49] if percentiles else 0.0,
+            "p99": percentiles[98] if percentiles else 0.0, "max": max(latencies, default=0.0)}
+
+
+def _agree_client(private, server_public, public):
+    key = session_key(shared_secret(_GROUP, private, server_public), _GROUP)
+    return confirmation(key, public, server_public)
+
+
+def print_report(result):
+    print(f"{result['handshakes']:,} handshakes in {result['elapsed']:.2f}s: {result['rate']:,.1f} handshakes/s, "
+          f"p50 {result['p50'] * 1e3:.1f} ms, p99 {result['p99'] * 1e3:.1f} ms, max {result['max'] * 1e3:.1f} ms, "
+          f"{result['errors']:,} errors")
+
+
+async def demo(bits=2048, workers=None, pool_size=DEFAULT_POOL_SIZE, concurrency=100, total=1000, verify=False):
+    """
+    Starts a server on a free local port, runs the load generator against it and prints both sides' figures.
+    """
+    server = DHServer(bits, workers, pool_size)
+    port = await server.start("127.0.0.1", 0)
+    # Give the refill tasks a moment to fill the key pool before the first request.
+    await server.fill()
+    try:
+        print_report(await load_test("127.0.0.1", port, bits, concurrency, total, verify))
+        print(server.stats())
+    finally:
+        await server.close()
+
+
+def _raise_file_limit():
+    """
+    Raises the soft limit on open files to the hard limit, so thousands of connections can be open at once.
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="An asyncio Diffie-Hellman key agreement server and load generator.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_command = commands.add_parser("serve", help="run the server")
+    load_command = commands.add_parser("load", help="run the load generator against a running server")
+    demo_command = commands.add_parser("demo", help="run a server and the load generator in one process")
+    for command in (serve_command, load_command):
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=DEFAULT_PORT)
+    for command in (serve_command, load_command, demo_command):
+        command.add_argument("-b", "--bits", type=int, default=2048, help="RFC 3526 group size (default: 2048)")
+        command.add_argument("-j", "--workers", type=int, default=None, help="worker processes (the server uses at "
+                                                                             "least 2; default: one per CPU)")
+    for command in (serve_command, demo_command):
+        command.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE, help="pre-generated key pairs")
+    for command in (load_command, demo_command):
+        command.add_argument("-c", "--concurrency", type=int, default=1000, help="simultaneous connections")
+        command.add_argument("-n", "--total", type=int, default=10000, help="key agreements in total")
+        command.add_argument("--verify", action="store_true", help="check every confirmation tag")
+    args = parser.parse_args(argv)
+
+    _raise_file_limit()
+    try:
+        if args.command == "serve":
+            asyncio.run(serve(args.host, args.port, args.bits, args.workers, args.pool_size))
+        elif args.command == "load":
+            print_report(asyncio.run(load_test(args.host, args.port, args.bits, args.concurrency, args.total,
+                                               args.verify, args.workers)))
+        else:
+            asyncio.run(demo(args.bits, args.workers, args.pool_size, args.concurrency, args.total, args.verify))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+diffie_hellman_key_exchange() in Diffie-Hellman-Key-Exchange-Algorithm.py plays both parties in one function and
+computes both key pairs from scratch. This turns the same exchange into a network service:
+
+1. The server runs on asyncio, so thousands of connections cost one coroutine each rather than one thread each.
+   Every modular exponentiation runs on a process pool, so the event loop never blocks and all cores do the math.
+2. A KeyPool keeps up to --pool-size ephemeral key pairs ready. Refill tasks, one fewer than the workers (the server
+   uses at least two), generate them in batches on the same workers, with the fixed-base table from
+   dh_precompute.py, whenever the pool has room, so a worker is always left for key agreements, which would
+   otherwise queue behind the refill batches. A request takes a pair from the pool and only computes the shared
+   secret: one exponentiation instead of two. If refilling fails, requests get "ERR key generation failed" instead
+   of waiting forever.
+3. The server proves it derived the session key (SHA-256 of the shared secret) with an HMAC over both public keys.
+   With --verify the load generator checks every tag, which costs it one exponentiation per handshake.
+4. The load generator opens --concurrency connections, spreads --total agreements over them and reports
+   handshakes per second and the p50 and p99 latency. Every key pair is used once by the server; a real client
+   would also use a fresh pair per agreement.
+
+Examples:
+
+    python dh_server.py serve --bits 2048 -j 8
+    python dh_server.py load --concurrency 2000 --total 20000
+    python dh_server.py demo --bits 1536 --concurrency 100 --total 500 --verify
+"""
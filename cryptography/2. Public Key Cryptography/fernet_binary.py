@@ -0,0 +1,171 @@
+import argparse
+import base64
+import os
+import sys
+import time
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes, padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.hmac import HMAC
+
+# version (1 byte) + timestamp (8) + IV (16) before the ciphertext, HMAC-SHA256 (32) after it.
+TOKEN_OVERHEAD = 1 + 8 + 16 + 32
+
+# The known answer of the Fernet specification: this key, time and the IV 00 01 ... 0f turn b"hello" into this token.
+SPEC_KEY = b"cw_0x689RpI-jtRR7oE8h_eQsKImvJapLeSbXpwF4e4="
+SPEC_TIME = 499162800
+SPEC_TOKEN = b"gAAAAAAdwJ6wAAECAwQFBgcICQoLDA0ODy021cpGVWKZ_eEwCGM4BLLF_5CV9dOPmrhuVUPgJobwOz7JcbmrR64jVmpU4IwqDA=="
+
+
+class BinaryFernet:
+    """
+    Fernet encryption (AES-128-CBC with HMAC-SHA256) that produces and accepts tokens as raw bytes.
+
+    A token is byte for byte the base64-decoded form of the token Fernet would produce, so it can always be
+    converted to and from a standard Fernet token with to_token() and from_token(). Skipping the base64 step
+    makes tokens 25% smaller and encryption several times faster on large messages.
+    """
+
+    def __init__(self, key):
+        """
+        Args:
+            key (bytes or str): A Fernet key, as returned by Fernet.generate_key().
+        """
+        Fernet(key)  # Validates the key.
+        raw = base64.urlsafe_b64decode(key)
+        self._signing_key = raw[:16]
+        self._aes = algorithms.AES(raw[16:])
+
+    def encrypt(self, data, current_time=None):
+        """
+        Encrypts data (bytes-like) into a binary token.
+        """
+        if current_time is None:
+            current_time = int(time.time())
+        return self._encrypt_from_parts(data, current_time, os.urandom(16))
+
+    def _encrypt_from_parts(self, data, current_time, iv):
+        encryptor = Cipher(self._aes, modes.CBC(iv)).encryptor()
+        # The token is built in place; PKCS7 padding is encrypted separately instead of copying the data to pad it.
+        pad = 16 - len(data) % 16
+        token = bytearray(b"\x80" + current_time.to_bytes(8, "big") + iv)
+        token += encryptor.update(data)
+        token += encryptor.update(bytes([pad]) * pad)
+        token += encryptor.finalize()
+        h = HMAC(self._signing_key, hashes.SHA256())
+        h.update(token)
+        token += h.finalize()
+        return bytes(token)
+
+    def decrypt(self, token):
+        """
+        Verifies and decrypts a binary token.
+
+        Raises:
+            InvalidToken: If the token is malformed or was not produced with this key.
+        """
+        token = memoryview(token)
+        if len(token) < TOKEN_OVERHEAD + 16 or token[0] != 0x80 or (len(token) - TOKEN_OVERHEAD) % 16:
+            raise InvalidToken
+        h = HMAC(self._signing_key, hashes.SHA256())
+        h.update(token[:-32])
+        try:
+            h.verify(bytes(token[-32:]))
+        except InvalidSignature:
+            raise InvalidToken from None
+        decryptor = Cipher(self._aes, modes.CBC(bytes(token[9:25]))).decryptor()
+        unpadder = padding.PKCS7(128).unpadder()
+        try:
+            padded = decryptor.update(token[25:-32]) + decryptor.finalize()
+            return unpadder.update(padded) + unpadder.finalize()
+        except ValueError:
+            raise InvalidToken from None
+
+    @staticmethod
+    def timestamp(token):
+        """
+        Returns the (unverified) creation time stored in a binary token.
+        """
+        return int.from_bytes(token[1:9], "big")
+
+
+def to_token(binary_token):
+    """
+    Converts a binary token into a standard Fernet token.
+    """
+    return base64.urlsafe_b64encode(binary_token)
+
+
+def from_token(token):
+    """
+    Converts a standard Fernet token into a binary token.
+    """
+    return base64.urlsafe_b64decode(token)
+
+
+def self_test():
+    """
+    Checks BinaryFernet against the Fernet specification's token and against Fernet itself in both directions:
+    binary tokens must decrypt with Fernet after to_token(), Fernet tokens must decrypt with BinaryFernet after
+    from_token(), and tampered tokens must be rejected by both.
+
+    Raises:
+        AssertionError: If any check fails.
+    """
+    spec = BinaryFernet(SPEC_KEY)
+    if to_token(spec._encrypt_from_parts(b"hello", SPEC_TIME, bytes(range(16)))) != SPEC_TOKEN:
+        raise AssertionError("encrypt: the token of the Fernet specification was not reproduced")
+    if spec.decrypt(from_token(SPEC_TOKEN)) != b"hello" or spec.timestamp(from_token(SPEC_TOKEN)) != SPEC_TIME:
+        raise AssertionError("decrypt: the token of the Fernet specification was not read back")
+    key = Fernet.generate_key()
+    fernet, binary = Fernet(key), BinaryFernet(key)
+    for length in (0, 1, 15, 16, 17, 1000, 1 << 16):
+        data = os.urandom(length)
+        token = binary.encrypt(data)
+        if fernet.decrypt(to_token(token)) != data:
+            raise AssertionError(f"Fernet could not decrypt a BinaryFernet token of {length} bytes")
+        if binary.decrypt(from_token(fernet.encrypt(data))) != data:
+            raise AssertionError(f"BinaryFernet could not decrypt a Fernet token of {length} bytes")
+        tampered = bytearray(token)
+        tampered[len(tampered) // 2] ^= 1
+        for decrypt in (binary.decrypt, lambda t: fernet.decrypt(to_token(t))):
+            try:
+                decrypt(bytes(tampered))
+            except InvalidToken:
+                continue
+            raise AssertionError(f"a tampered token of {length} bytes was accepted")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check BinaryFernet against the Fernet specification and Fernet.")
+    parser.parse_args(argv)
+    self_test()
+    print("BinaryFernet matches the Fernet specification and round-trips with Fernet in both directions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+
+"""
+Fernet, as used in ../example.py, returns tokens in url-safe base64. For bulk data that costs a third more space and
+most of the encryption time: AES and HMAC run in OpenSSL at hundreds of MB/s, while the base64 encoding and the
+character translation for the url-safe alphabet are extra passes over the data.
+
+BinaryFernet performs exactly the same steps (PKCS7 padding, AES-128-CBC with a random IV, HMAC-SHA256 over the
+version byte, timestamp, IV and ciphertext) but keeps the token in binary. rsa_hybrid.py and fernet_container.py, next
+to it in this folder, use it to encrypt files chunk by chunk.
+
+    from cryptography.fernet import Fernet
+    from fernet_binary import BinaryFernet, to_token
+
+    key = Fernet.generate_key()
+    token = BinaryFernet(key).encrypt(b"This is a secret message")
+    assert Fernet(key).decrypt(to_token(token)) == b"This is a secret message"
+
+Running the module (python fernet_binary.py) calls self_test(), which reproduces the token of the Fernet
+specification byte for byte and round-trips messages of several lengths between BinaryFernet and Fernet.
+"""
@@ -0,0 +1,419 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import statistics
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from cryptography.fernet import Fernet, InvalidToken
+
+DEFAULT_PORT = 8766
+DEFAULT_LIFETIME = 3600
+# A cached ticket is handed out again only while it has at least this fraction of its lifetime left, so a client
+# never receives a ticket that is about to expire.
+REUSE_FRACTION = 0.5
+DEFAULT_CACHE_SIZE = 100000
+# Requests are sent to the worker processes in batches of up to this many, so the cost of a round trip to a
+# worker is shared by many tickets.
+BATCH_SIZE = 64
+TIMEOUT = 30
+# Every request is a JSON object with these fields; one without them is answered as malformed.
+REQUEST_FIELDS = ("client", "service", "nonce")
+# Only for demos and load tests: every principal's key is derived from this master secret (see derive_key()).
+DEMO_MASTER = b"kdc demo master secret"
+
+
+def derive_key(master, name):
+    """
+    Derives a principal's long-term Fernet key from a master secret, as HMAC-SHA256(master, name).
+    """
+    return base64.urlsafe_b64encode(hmac.new(master, name.encode(), hashlib.sha256).digest())
+
+
+def _issue(client_key, service_key, client, service, nonce, cached, lifetime):
+    """
+    Issues a ticket for client to service, or re-wraps a cached one.
+
+    Returns:
+        tuple: (session_key, ticket, expires, client_part). The ticket is encrypted for the service and tells it
+            the session key and who the client is; the client part is encrypted for the client and holds the
+            same session key, the service's name, the client's nonce and the expiry time.
+    """
+    if cached is None:
+        session_key = Fernet.generate_key().decode()
+        expires = int(time.time()) + lifetime
+        ticket = Fernet(service_key).encrypt(
+            json.dumps({"session_key": session_key, "client": client, "expires": expires}).encode()).decode()
+    else:
+        session_key, ticket, expires = cached
+    # The client part is always new, since it has to carry this request's nonce.
+    client_part = Fernet(client_key).encrypt(json.dumps(
+        {"session_key": session_key, "service": service, "nonce": nonce, "expires": expires}).encode()).decode()
+    return session_key, ticket, expires, client_part
+
+
+def _issue_batch(jobs):
+    return [_issue(*job) for job in jobs]
+
+
+class TicketCache:
+    """
+    An LRU cache of issued tickets, keyed by (client, service).
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, lifetime=DEFAULT_LIFETIME):
+        self.max_size = max_size
+        self.lifetime = lifetime
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, client, service):
+        """
+        Returns (session_key, ticket, expires) if a ticket with enough lifetime left is cached, otherwise None.
+        """
+        entry = self._entries.get((client, service))
+        if entry is not None and entry[2] - time.time() >= self.lifetime * REUSE_FRACTION:
+            self._entries.move_to_end((client, service))
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def put(self, client, service, session_key, ticket, expires):
+        self._entries[(client, service)] = (session_key, ticket, expires)
+        self._entries.move_to_end((client, service))
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _Batcher:
+    """
+    Collects jobs from many coroutines and runs them in batches on a process pool (or in-process without one).
+    """
+
+    def __init__(self, executor, batch_size=BATCH_SIZE, dispatchers=1):
+        self._executor = executor
+        self._batch_size = batch_size
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._dispatch()) for _ in range(dispatchers)]
+
+    async def submit(self, job):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((job, future))
+        return await future
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            jobs = [job for job, _ in batch]
+            try:
+                if self._executor:
+                    results = await loop.run_in_executor(self._executor, _issue_batch, jobs)
+                else:
+                    results = _issue_batch(jobs)
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class KDCServer:
+    """
+    A Key Distribution Center that issues session keys and tickets to registered principals over TCP.
+
+    The protocol is one JSON object per line. The client sends {"client", "service", "nonce"} and the KDC answers
+    {"client_part", "ticket"} (both Fernet tokens, see _issue()) or {"error"}. A connection may send any number of
+    requests.
+    """
+
+    def __init__(self, workers=None, lifetime=DEFAULT_LIFETIME, cache_size=DEFAULT_CACHE_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.lifetime = lifetime
+        self.principals = {}
+        self.cache = TicketCache(cache_size, lifetime)
+        self.tickets = 0
+        self.errors = 0
+        self._executor = None
+        self._batcher = None
+        self._server = None
+        self._connections = set()
+
+    def register(self, name, key=None):
+        """
+        Registers a principal with its long-term key (a new random Fernet key by default) and returns the key.
+        """
+        self.principals[name] = key or Fernet.generate_key()
+        return self.principals[name]
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        if self.workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        # Two batches per worker in flight, so a worker never waits for the event loop.
+        self._batcher = _Batcher(self._executor, BATCH_SIZE, 2 * self.workers if self._executor else 1)
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=4096)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._server.close()
+        # Connections that are still open would otherwise wait for their next request until the timeout.
+        for task in self._connections:
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        await self._batcher.close()
+        if self._executor:
+            self._executor.shutdown(cancel_futures=True)
+
+    async def issue(self, client, service, nonce):
+        """
+        Issues (or re-issues from the cache) a ticket for client to service.
+
+        Raises:
+            KeyError: If either principal is not registered.
+        """
+        client_key = self.principals[client]
+        service_key = self.principals[service]
+        cached = self.cache.get(client, service)
+        session_key, ticket, expires, client_part = await self._batcher.submit(
+            (client_key, service_key, client, service, nonce, cached, self.lifetime))
+        if cached is None:
+            self.cache.put(client, service, session_key, ticket, expires)
+        self.tickets += 1
+        return client_part, ticket
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    # readline() raises ValueError (LimitOverrunError) when a line exceeds the stream limit.
+                    line = await asyncio.wait_for(reader.readline(), TIMEOUT)
+                except ValueError:
+                    line = None
+                if line == b"":
+                    break
+                try:
+                    if line is None:
+                        raise ValueError("line too long")
+                    request = json.loads(line)
+                    if not isinstance(request, dict) or not all(field in request for field in REQUEST_FIELDS):
+                        raise ValueError("missing field")
+                    client_part, ticket = await self.issue(request["client"], request["service"],
+                                                           str(request["nonce"]))
+                    answer = {"client_part": client_part, "ticket": ticket}
+                except (ValueError, KeyError, TypeError) as error:
+                    self.errors += 1
+                    answer = {"error": f"unknown principal {error}" if isinstance(error, KeyError) else
+                              "malformed request"}
+                writer.write(json.dumps(answer).encode() + b"\n")
+                await writer.drain()
+        except (asyncio.TimeoutError, asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    def stats(self):
+        return (f"{self.tickets:,} tickets, {self.errors:,} errors, {len(self.cache):,} cached, "
+                f"{self.cache.hits:,} cache hits, {self.cache.misses:,} misses")
+
+
+def register_demo_principals(kdc, clients, services, master=DEMO_MASTER):
+    """
+    Registers client0 ... and service0 ... with keys derived from master, which the load generator also knows.
+    """
+    for i in range(clients):
+        kdc.register(f"client{i}", derive_key(master, f"client{i}"))
+    for i in range(services):
+        kdc.register(f"service{i}", derive_key(master, f"service{i}"))
+
+
+async def serve(host="127.0.0.1", port=DEFAULT_PORT, workers=None, clients=10000, services=10):
+    """
+    Runs a KDCServer with the demo principals until it is interrupted, printing statistics every ten seconds.
+    """
+    kdc = KDCServer(workers)
+    register_demo_principals(kdc, clients, services)
+    port = await kdc.start(host, port)
+    print(f"KDC listening on {host}:{port}, {clients:,} clients, {services} services, {kdc.workers} worker(s)",
+          file=sys.stderr)
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(kdc.stats(), file=sys.stderr)
+    finally:
+        await kdc.close()
+
+
+async def load_test(host="127.0.0.1", port=DEFAULT_PORT, concurrency=10000, total=100000, services=10,
+                    verify=False):
+    """
+    Requests total tickets over concurrency simultaneous connections, client i asking for service i % services.
+
+    Every connection requests its share of the tickets one after another and measures each from sending the
+    request to receiving the answer. With verify, every client part is decrypted with the client's key and its
+    nonce and service checked.
+
+    Returns:
+        dict: The number of tickets and errors, the elapsed time, tickets per second and the p50, p99 and maximum
+            latencies in seconds.
+    """
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def client(index):
+        nonlocal errors
+        name = f"client{index}"
+        service = f"service{index % services}"
+        fernet = Fernet(derive_key(DEMO_MASTER, name)) if verify else None
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            # The other connections take over this one's share of the requests.
+            errors += 1
+            return
+        try:
+            for n in counter:
+                nonce = f"{index}-{n}"
+                start = time.perf_counter()
+                writer.write(json.dumps({"client": name, "service": service, "nonce": nonce}).encode() + b"\n")
+                await writer.drain()
+                answer = json.loads(await reader.readline())
+                latencies.append(time.perf_counter() - start)
+                if "error" in answer:
+                    errors += 1
+                elif verify:
+                    part = json.loads(fernet.decrypt(answer["client_part"]))
+                    if part["nonce"] != nonce or part["service"] != service:
+                        errors += 1
+        except (ConnectionError, ValueError, InvalidToken):
+            errors += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {"tickets": len(latencies), "errors": errors, "elapsed": elapsed, "rate": len(latencies) / elapsed,
+            "p50": percentiles[49] if percentiles else 0.0, "p99": percentiles[98] if percentiles else 0.0,
+            "max": max(latencies, default=0.0)}
+
+
+def print_report(result):
+    print(f"{result['tickets']:,} tickets in {result['elapsed']:.2f}s: {result['rate']:,.1f} tickets/s, "
+          f"p50 {result['p50'] * 1e3:.1f} ms, p99 {result['p99'] * 1e3:.1f} ms, max {result['max'] * 1e3:.1f} ms, "
+          f"{result['errors']:,} errors")
+
+
+async def demo(workers=None, concurrency=1000, total=20000, services=10, verify=False):
+    """
+    Starts a KDC on a free local port, runs the load generator against it and prints both sides' figures.
+    """
+    kdc = KDCServer(workers)
+    register_demo_principals(kdc, concurrency, services)
+    port = await kdc.start("127.0.0.1", 0)
+    try:
+        print_report(await load_test("127.0.0.1", port, concurrency, total, services, verify))
+        print(kdc.stats())
+    finally:
+        await kdc.close()
+
+
+def _raise_file_limit():
+    """
+    Raises the soft limit on open files to the hard limit, so thousands of connections can be open at once.
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="An asyncio Key Distribution Center with a ticket cache, and a "
+                                                 "load generator.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_command = commands.add_parser("serve", help="run the KDC with demo principals")
+    load_command = commands.add_parser("load", help="run the load generator against a running KDC")
+    demo_command = commands.add_parser("demo", help="run a KDC and the load generator in one process")
+    for command in (serve_command, load_command):
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=DEFAULT_PORT)
+    for command in (serve_command, load_command, demo_command):
+        command.add_argument("--services", type=int, default=10, help="number of service principals")
+    for command in (serve_command, demo_command):
+        command.add_argument("-j", "--workers", type=int, default=None)
+    serve_command.add_argument("--clients", type=int, default=10000, help="number of client principals")
+    for command in (load_command, demo_command):
+        command.add_argument("-c", "--concurrency", type=int, default=10000, help="simultaneous clients")
+        command.add_argument("-n", "--total", type=int, default=100000, help="tickets in total")
+        command.add_argument("--verify", action="store_true", help="decrypt and check every client part")
+    args = parser.parse_args(argv)
+
+    _raise_file_limit()
+    try:
+        if args.command == "serve":
+            asyncio.run(serve(args.host, args.port, args.workers, args.clients, args.services))
+        elif args.command == "load":
+            print_report(asyncio.run(load_test(args.host, args.port, args.concurrency, args.total, args.services,
+                                               args.verify)))
+        else:
+            asyncio.run(demo(args.workers, args.concurrency, args.total, args.services, args.verify))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+A runnable version of the Key Distribution Center described in "Key Distribution Center (KDC).md":
+
+1. Every principal (client or service) shares a long-term Fernet key with the KDC. A client asks for a ticket to a
+   service, with a fresh nonce. The KDC answers with two Fernet tokens: the client part, readable only by the client,
+   holds the session key, the service name, the nonce and the expiry time; the ticket, readable only by the service,
+   holds the same session key and the client's name. The client passes the ticket on to the service.
+2. The server runs on asyncio, so 10,000 simultaneous clients cost one coroutine each. Encryption runs on a process
+   pool: requests are collected into batches of up to BATCH_SIZE, so one round trip to a worker serves many tickets.
+3. Issued tickets are cached per (client, service) in an LRU TicketCache. While a cached ticket has at least half of
+   its lifetime left, a repeated request reuses its session key and ticket; only the client part is encrypted again,
+   because it must carry the new nonce.
+4. The load generator opens --concurrency connections, one client principal each, and reports tickets per second and
+   the p50 and p99 latency. For the demo every long-term key is derived from a fixed master secret, so the load
+   generator can check the answers; a real KDC would store randomly generated keys.
+
+Examples:
+
+    python kdc_server.py serve --clients 10000 -j 8
+    python kdc_server.py load --concurrency 10000 --total 200000
+    python kdc_server.py demo --concurrency 1000 --total 20000 --verify
+"""
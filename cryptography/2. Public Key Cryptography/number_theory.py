@@ -0,0 +1,180 @@
+import argparse
+import math
+import random
+import sys
+import time
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+# The backend used when a function is called without one: gmpy2 (GMP) when it is installed, pure Python otherwise.
+BACKEND = "gmpy2" if gmpy2 else "python"
+
+
+def _backend(backend):
+    backend = backend or BACKEND
+    if backend == "gmpy2" and gmpy2 is None:
+        raise ValueError("The gmpy2 backend is not installed (pip install gmpy2).")
+    if backend not in ("python", "gmpy2"):
+        raise ValueError(f"Unknown backend {backend!r}; choose python or gmpy2.")
+    return backend
+
+
+def gcd(a, b, backend=None):
+    """
+    Returns the greatest common divisor of a and b.
+    """
+    if _backend(backend) == "gmpy2":
+        return int(gmpy2.gcd(a, b))
+    return math.gcd(a, b)
+
+
+def extended_gcd(a, b, backend=None):
+    """
+    Iterative extended Euclidean algorithm.
+
+    Unlike the recursive version, it needs no stack frame per step, so it never reaches the recursion limit however
+    large the numbers are.
+
+    Returns:
+        tuple: (g, x, y) with g = gcd(a, b) and a * x + b * y = g.
+    """
+    if _backend(backend) == "gmpy2":
+        g, x, y = gmpy2.gcdext(a, b)
+        return int(g), int(x), int(y)
+    x0, x1, y0, y1 = 1, 0, 0, 1
+    while b:
+        q, a, b = a // b, b, a % b
+        x0, x1 = x1, x0 - q * x1
+        y0, y1 = y1, y0 - q * y1
+    return a, x0, y0
+
+
+def mod_inverse(a, m, backend=None):
+    """
+    Returns the inverse of a modulo m.
+
+    Raises:
+        ValueError: If a and m are not coprime, so that no inverse exists.
+    """
+    try:
+        if _backend(backend) == "gmpy2":
+            return int(gmpy2.invert(a, m))
+        # pow() runs the same extended Euclidean algorithm as extended_gcd(), in C.
+        return pow(a, -1, m)
+    except (ValueError, ZeroDivisionError):
+        raise ValueError("Modular inverse does not exist for these values.") from None
+
+
+def batch_mod_inverse(values, m, backend=None):
+    """
+    Inverts many numbers modulo the same m with Montgomery's trick: one modular inversion in total.
+
+    The running products v1, v1 * v2, ..., v1 * ... * vn are computed, only the last one is inverted, and the
+    inverses of the individual values are peeled off it going backwards. That costs 3 * (n - 1) multiplications
+    plus one inversion, where inverting every value separately costs n inversions, each far more expensive than a
+    multiplication.
+
+    Args:
+        values (iterable): The numbers to invert (ints).
+        m (int): The modulus.
+        backend (str): "python" or "gmpy2" (default: BACKEND).
+
+    Returns:
+        list: The inverses, in the order of values.
+
+    Raises:
+        ValueError: If any value is not coprime to m; the message gives the index of the first one.
+    """
+    backend = _backend(backend)
+    if backend == "gmpy2":
+        m = gmpy2.mpz(m)
+        values = [gmpy2.mpz(v) % m for v in values]
+    else:
+        values = [v % m for v in values]
+    if not values:
+        return []
+    prefix = [values[0]]
+    for v in values[1:]:
+        prefix.append(prefix[-1] * v % m)
+    try:
+        inverse = mod_inverse(prefix[-1], m, backend)
+    except ValueError:
+        first = next(i for i, v in enumerate(values) if gcd(v, m, backend) != 1)
+        raise ValueError(f"Value {first} has no inverse modulo m.") from None
+    if backend == "gmpy2":
+        inverse = gmpy2.mpz(inverse)
+    inverses = [0] * len(values)
+    for i in range(len(values) - 1, 0, -1):
+        # inverse is (v0 * ... * vi) ** -1 here, so multiplying by prefix[i - 1] leaves vi ** -1.
+        inverses[i] = int(inverse * prefix[i - 1] % m)
+        inverse = inverse * values[i] % m
+    inverses[0] = int(inverse)
+    return inverses
+
+
+def benchmark(count=10000, backends=None):
+    """
+    Prints inverses per second when inverting count random numbers one by one and with batch_mod_inverse(), for
+    every installed backend and three Mersenne prime moduli.
+    """
+    if backends is None:
+        backends = ["python", "gmpy2"] if gmpy2 else ["python"]
+        if not gmpy2:
+            print("gmpy2 is not installed; only the pure Python backend is measured.")
+    rng = random.Random(1)
+    for bits in (127, 521, 2203):
+        m = 2 ** bits - 1
+        values = [rng.randrange(1, m) for _ in range(count)]
+        expected = None
+        for backend in backends:
+            start = time.perf_counter()
+            single = [mod_inverse(v, m, backend) for v in values]
+            single_rate = count / (time.perf_counter() - start)
+            start = time.perf_counter()
+            batch = batch_mod_inverse(values, m, backend)
+            batch_rate = count / (time.perf_counter() - start)
+            expected = expected or single
+            assert single == batch == expected, backend
+            print(f"{bits:>5}-bit modulus  {backend:<7} one by one {single_rate:12,.0f}/s   "
+                  f"batch {batch_rate:12,.0f}/s   {batch_rate / single_rate:5.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark modular inversion, one by one and batched.")
+    parser.add_argument("-n", "--count", type=int, default=10000, help="numbers to invert per modulus")
+    parser.add_argument("--backend", choices=["python", "gmpy2"], nargs="+", default=None)
+    args = parser.parse_args(argv)
+    benchmark(args.count, args.backend)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+The number theory the cipher scripts share, in one place:
+
+1. gcd(), extended_gcd() and mod_inverse() replace the copies in Affine-cypher.py, RSA1.py, RSA2.py, RSA3.PY and
+   rsa_keygen.py. extended_gcd() is iterative; the recursive version in RSA1.py and RSA3.PY needed one stack frame
+   per step. mod_inverse() always raises ValueError when there is no inverse.
+2. batch_mod_inverse() uses Montgomery's trick to invert n numbers with one inversion and 3 * (n - 1)
+   multiplications, which pays off whenever many inverses modulo the same number are needed at once (e.g.
+   normalizing many elliptic-curve points, or a batch of RSA blinding factors).
+3. Every function takes an optional backend. gmpy2 (GMP) is used when it is installed and pure Python otherwise;
+   results are plain ints either way.
+
+The RSA scripts next to it import it directly. Affine-cypher.py, in "1. Types of Cyphers", loads it by path with
+load_script() from that folder's script_loader.py.
+
+Examples:
+
+    from number_theory import mod_inverse, batch_mod_inverse
+
+    assert mod_inverse(5, 26) == 21
+    assert batch_mod_inverse([3, 5, 7], 11) == [4, 9, 8]
+
+    python number_theory.py --count 100000
+"""
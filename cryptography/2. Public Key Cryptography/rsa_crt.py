@@ -0,0 +1,147 @@
+import argparse
+import os
+import secrets
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from number_theory import mod_inverse
+from rsa_keygen import generate_keypair
+
+RSAPrivateKey = namedtuple("RSAPrivateKey", ["n", "e", "d", "p", "q", "dp", "dq", "qinv"])
+
+# Set in every worker process by _init_worker(), so the key is sent once per worker.
+_KEY = None
+
+
+def crt_private_key(n, e, d, p, q):
+    """
+    Builds a private key with the Chinese Remainder Theorem parameters precomputed.
+
+    Args:
+        n, e, d, p, q (int): The modulus, the exponents and the two primes. An RSAKey from rsa_keygen can be
+            passed as crt_private_key(*key).
+
+    Returns:
+        RSAPrivateKey: The key with dp = d mod (p - 1), dq = d mod (q - 1) and qinv = q ** -1 mod p.
+    """
+    if p * q != n:
+        raise ValueError("p * q must equal n.")
+    return RSAPrivateKey(n, e, d, p, q, d % (p - 1), d % (q - 1), mod_inverse(q, p))
+
+
+def decrypt(key, c):
+    """
+    Computes c ** d mod n with the Chinese Remainder Theorem.
+
+    The exponentiation is split into one modulo p and one modulo q. Both have half-size moduli and exponents, so
+    each is about eight times cheaper than the full one, and Garner's formula recombines the two results.
+
+    Args:
+        key (RSAPrivateKey): The private key.
+        c (int): The ciphertext, 0 <= c < n.
+
+    Returns:
+        int: The plaintext.
+    """
+    if not 0 <= c < key.n:
+        raise ValueError("The ciphertext must be between 0 and n - 1.")
+    m1 = pow(c, key.dp, key.p)
+    m2 = pow(c, key.dq, key.q)
+    h = key.qinv * (m1 - m2) % key.p
+    return m2 + h * key.q
+
+
+def sign(key, m):
+    """
+    Signs a message representative m (0 <= m < n) with the private key, using the CRT.
+    """
+    return decrypt(key, m)
+
+
+def verify(key, m, signature):
+    """
+    Checks a signature with the public part (n, e) of a key.
+    """
+    return pow(signature, key.e, key.n) == m
+
+
+def _init_worker(key):
+    global _KEY
+    _KEY = key
+
+
+def _decrypt_job(c):
+    return decrypt(_KEY, c)
+
+
+def decrypt_many(key, ciphertexts, workers=None, chunksize=16):
+    """
+    Decrypts many ciphertexts on a process pool.
+
+    The key is handed to every worker once by the pool initializer and the ciphertexts are sent in batches of
+    chunksize, so the overhead per ciphertext is a few hundred bytes of pickling.
+
+    Args:
+        key (RSAPrivateKey): The private key.
+        ciphertexts (iterable): The ciphertexts (ints).
+        workers (int): The number of worker processes (default: one per CPU; 1 runs in-process).
+        chunksize (int): The number of ciphertexts sent to a worker at a time.
+
+    Returns:
+        list: The plaintexts, in the order of the ciphertexts.
+    """
+    if workers == 1:
+        return [decrypt(key, c) for c in ciphertexts]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(key,)) as executor:
+        return list(executor.map(_decrypt_job, ciphertexts, chunksize=chunksize))
+
+
+def benchmark(bits_list=(2048, 4096), count=200, workers=None):
+    """
+    Prints decryptions per second with pow(c, d, n), with the CRT, and with the CRT on a process pool.
+    """
+    for bits in bits_list:
+        key = crt_private_key(*generate_keypair(bits))
+        messages = [secrets.randbelow(key.n) for _ in range(count)]
+        ciphertexts = [pow(m, key.e, key.n) for m in messages]
+        rates = []
+        for name, function in (
+                ("pow(c, d, n)", lambda: [pow(c, key.d, key.n) for c in ciphertexts]),
+                ("CRT", lambda: [decrypt(key, c) for c in ciphertexts]),
+                (f"CRT, {workers or os.cpu_count()} worker(s)", lambda: decrypt_many(key, ciphertexts, workers))):
+            start = time.perf_counter()
+            assert function() == messages, name
+            rates.append(count / (time.perf_counter() - start))
+            print(f"{bits:>5} bits  {name:<18}{rates[-1]:10.1f} decryptions/s  {rates[-1] / rates[0]:5.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare RSA decryption with and without the Chinese Remainder "
+                                                 "Theorem.")
+    parser.add_argument("-b", "--bits", type=int, nargs="+", default=[2048, 4096])
+    parser.add_argument("-n", "--count", type=int, default=200, help="ciphertexts per key size")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    benchmark(args.bits, args.count, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+Here's how the CRT private key works:
+
+1. crt_private_key() precomputes dp = d mod (p - 1), dq = d mod (q - 1) and qinv = q ** -1 mod p once per key.
+2. decrypt() and sign() compute m1 = c ** dp mod p and m2 = c ** dq mod q and recombine them with Garner's formula,
+   m = m2 + q * (qinv * (m1 - m2) mod p). Modular exponentiation costs roughly the cube of the modulus size, so two
+   half-size exponentiations are about four times faster than one full-size pow(c, d, n).
+3. decrypt_many() decrypts batches of ciphertexts on a process pool; the key is sent to each worker once.
+4. benchmark() measures all three paths on freshly generated 2048- and 4096-bit keys and checks that they agree.
+
+Example:
+
+    python rsa_crt.py --bits 2048 4096 --count 500
+"""
@@ -0,0 +1,235 @@
+import argparse
+import json
+import math
+import os
+import secrets
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from number_theory import mod_inverse
+
+DEFAULT_EXPONENT = 65537
+# Odd candidates are sieved in windows of this many numbers before any Miller-Rabin test.
+SIEVE_WINDOW = 4096
+
+RSAKey = namedtuple("RSAKey", ["n", "e", "d", "p", "q"])
+
+
+def primes_below(limit):
+    """
+    Returns all primes below limit, computed with the sieve of Eratosthenes.
+    """
+    sieve = bytearray([1]) * limit
+    sieve[:2] = b"\x00\x00"
+    for i in range(2, math.isqrt(limit - 1) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i, is_prime in enumerate(sieve) if is_prime]
+
+
+SMALL_PRIMES = primes_below(1 << 14)
+
+
+def miller_rabin_rounds(bits):
+    """
+    Returns the number of Miller-Rabin rounds that give an error probability below 2 ** -100 for random
+    candidates of the given size (FIPS 186-4, Table C.2).
+    """
+    if bits >= 1536:
+        return 4
+    if bits >= 1024:
+        return 5
+    if bits >= 512:
+        return 7
+    return 40
+
+
+def is_probable_prime(n, rounds=None, rng=secrets.SystemRandom()):
+    """
+    Tests n for primality with trial division by small primes followed by Miller-Rabin.
+
+    Args:
+        n (int): The number to test.
+        rounds (int): The number of Miller-Rabin rounds (default: miller_rabin_rounds(n.bit_length())).
+        rng: The random number generator for the bases.
+
+    Returns:
+        bool: False if n is composite, True if it is prime with overwhelming probability.
+    """
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    if n < SMALL_PRIMES[-1] ** 2:
+        return True
+    return _miller_rabin(n, rounds or miller_rabin_rounds(n.bit_length()), rng)
+
+
+def _miller_rabin(n, rounds, rng):
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for _ in range(rounds):
+        x = pow(rng.randrange(2, n - 1), d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _sieve(start, length):
+    """
+    Marks which of the odd numbers start, start + 2, ..., start + 2 * (length - 1) have a small prime factor.
+    """
+    composite = bytearray(length)
+    for p in SMALL_PRIMES[1:]:
+        # start + 2 * i is divisible by p when i = -start / 2 (mod p); (p + 1) // 2 is the inverse of 2.
+        i = (-start * ((p + 1) // 2)) % p
+        composite[i::p] = b"\x01" * len(range(i, length, p))
+    return composite
+
+
+def generate_prime(bits, e=DEFAULT_EXPONENT, rng=secrets.SystemRandom()):
+    """
+    Generates a random prime p of exactly bits bits, with its top two bits set and gcd(p - 1, e) = 1.
+
+    Setting the top two bits makes the product of two such primes exactly 2 * bits long. Candidates are taken
+    from a random odd starting point upwards; a window of them is sieved by all primes below 2 ** 14 at once,
+    and only the survivors get Miller-Rabin tests.
+    """
+    if bits < 16:
+        raise ValueError("Primes must have at least 16 bits.")
+    rounds = miller_rabin_rounds(bits)
+    while True:
+        start = rng.getrandbits(bits) | (3 << (bits - 2)) | 1
+        composite = _sieve(start, SIEVE_WINDOW)
+        for i in range(SIEVE_WINDOW):
+            if composite[i]:
+                continue
+            candidate = start + 2 * i
+            if candidate.bit_length() != bits:
+                break
+            if math.gcd(candidate - 1, e) == 1 and _miller_rabin(candidate, rounds, rng):
+                return candidate
+
+
+def generate_keypair(bits=2048, e=DEFAULT_EXPONENT, rng=secrets.SystemRandom()):
+    """
+    Generates an RSA key with a modulus of exactly bits bits.
+
+    The private exponent is the inverse of e modulo lcm(p - 1, q - 1), as in FIPS 186-4; the textbook
+    (p - 1) * (q - 1) works too but gives a larger d.
+
+    Args:
+        bits (int): The size of the modulus, e.g. 2048, 3072 or 4096.
+        e (int): The public exponent, an odd number greater than 2.
+        rng: The random number generator (default: the operating system's secure source).
+
+    Returns:
+        RSAKey: The modulus n, the exponents e and d and the primes p and q (p > q).
+    """
+    if e < 3 or e % 2 == 0:
+        raise ValueError("The public exponent must be odd and at least 3.")
+    while True:
+        p = generate_prime(bits - bits // 2, e, rng)
+        q = generate_prime(bits // 2, e, rng)
+        # Primes that are too close together make n easy to factor (Fermat's method).
+        if abs(p - q).bit_length() <= bits // 2 - 100:
+            continue
+        if p < q:
+            p, q = q, p
+        lam = (p - 1) * (q - 1) // math.gcd(p - 1, q - 1)
+        d = mod_inverse(e, lam)
+        # FIPS 186-4 also requires d > 2 ** (bits / 2).
+        if d.bit_length() > bits // 2:
+            return RSAKey(p * q, e, d, p, q)
+
+
+def _generate_job(bits, e):
+    return generate_keypair(bits, e)
+
+
+def generate_keys(count, bits=2048, e=DEFAULT_EXPONENT, workers=None):
+    """
+    Generates count independent keys in parallel on a process pool.
+
+    Every worker draws its randomness from the operating system, so forked workers never share a random state.
+
+    Yields:
+        RSAKey: The keys, as they are finished.
+    """
+    if workers == 1:
+        for _ in range(count):
+            yield generate_keypair(bits, e)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # The keys are independent, so each is yielded as soon as its worker is done, not in submission order.
+        for future in as_completed([executor.submit(_generate_job, bits, e) for _ in range(count)]):
+            yield future.result()
+
+
+def benchmark(bits_list=(2048, 3072, 4096), count=8, workers_list=None):
+    """
+    Prints the number of keys generated per second for each key size and number of worker processes.
+    """
+    if workers_list is None:
+        workers_list = sorted({1, 2, 4, os.cpu_count() or 1})
+    for bits in bits_list:
+        for workers in workers_list:
+            start = time.perf_counter()
+            keys = list(generate_keys(count, bits, workers=workers))
+            elapsed = time.perf_counter() - start
+            assert all(key.n.bit_length() == bits for key in keys)
+            print(f"{bits:>5} bits  {workers:>3} worker(s): {count / elapsed:8.2f} keys/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate RSA keys.")
+    parser.add_argument("-b", "--bits", type=int, default=2048, help="modulus size (default: 2048)")
+    parser.add_argument("-e", "--exponent", type=int, default=DEFAULT_EXPONENT)
+    parser.add_argument("-n", "--count", type=int, default=1, help="number of keys to generate")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--benchmark", action="store_true", help="report keys/s for 2048, 3072 and 4096 bits")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark(count=args.count if args.count > 1 else 8)
+        return 0
+    for key in generate_keys(args.count, args.bits, args.exponent, args.workers):
+        # One JSON object per key, with the integers in hexadecimal.
+        print(json.dumps({field: hex(value) for field, value in key._asdict().items()}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+Here's how the key generation works:
+
+1. primes_below() builds a list of the primes below 2 ** 14 once, when the module is imported.
+2. generate_prime() picks a random odd number with its top two bits set and sieves the next SIEVE_WINDOW odd numbers
+   with the small primes: for every small prime, the first multiple in the window is found with one modular
+   multiplication and all its multiples are crossed out with a single slice assignment. Only about one candidate in
+   ten survives, and only survivors get Miller-Rabin tests, with the number of rounds FIPS 186-4 gives for the size.
+3. mod_inverse() from number_theory.py computes d directly with the extended Euclidean algorithm instead of
+   searching for it.
+4. generate_keypair() combines two primes into a key, rejecting pairs that are too close together or that give a
+   small d. 2048-, 3072- and 4096-bit keys take a fraction of a second to a few seconds.
+5. generate_keys() spreads bulk key generation over a process pool, and benchmark() reports keys per second.
+
+Examples:
+
+    python rsa_keygen.py --bits 3072
+    python rsa_keygen.py --bits 2048 --count 1000 -j 8 > keys.jsonl
+    python rsa_keygen.py --benchmark
+"""
@@ -0,0 +1,492 @@
+import argparse
+import hmac
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BLOCK = 16
+# The constant of the field GF(2 ** 128) that CMAC and PMAC use: x ** 128 = x ** 7 + x ** 2 + x + 1.
+_R = 0x87
+# Multiplying by x ** -1 instead: x ** -1 = x ** 127 + x ** 6 + x + 1.
+_R_INVERSE = (1 << 127) | 0x43
+_MASK = (1 << 128) - 1
+# CMAC feeds OpenSSL at most this many bytes at a time, through one reusable output buffer.
+FEED_SIZE = 1 << 20
+# PMAC processes messages in chunks of this many blocks (64 KiB); the offsets of a chunk come from a per-key table.
+PMAC_CHUNK_BLOCKS = 4096
+KEY_CACHE_SIZE = 256
+
+
+# Known answers: the AES-128 examples of RFC 4493 (section 4) and two AES-256 examples of NIST SP 800-38B, as
+# (key, message, tag) in hex.
+_RFC4493_MESSAGE = ("6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51"
+                    "30c81c46a35ce411e5fbc1191a0a52eff69f2445df4f9b17ad2b417be66c3710")
+CMAC_VECTORS = (
+    ("2b7e151628aed2a6abf7158809cf4f3c", "", "bb1d6929e95937287fa37d129b756746"),
+    ("2b7e151628aed2a6abf7158809cf4f3c", _RFC4493_MESSAGE[:32], "070a16b46b4d4144f79bdd9dd04a287c"),
+    ("2b7e151628aed2a6abf7158809cf4f3c", _RFC4493_MESSAGE[:80], "dfa66747de9ae63030ca32611497c827"),
+    ("2b7e151628aed2a6abf7158809cf4f3c", _RFC4493_MESSAGE, "51f0bebf7e3b9d92fc49741779363cfe"),
+    ("603deb1015ca71be2b73aef0857d77811f352c073b6108d72d9810a30914dff4", "", "028962f61b7bf89efc6b551f4667d983"),
+    ("603deb1015ca71be2b73aef0857d77811f352c073b6108d72d9810a30914dff4", _RFC4493_MESSAGE[:32],
+     "28a7023f452e8f82bd4bf28d8c37c35c"),
+)
+# The published PMAC-AES-128 test vectors, with the key 000102...0f and the messages 00 01 02 ... of each length
+# (the last one is 1000 zero bytes).
+PMAC_VECTORS = (
+    (0, "4399572cd6ea5341b8d35876a7098af7"),
+    (3, "256ba5193c1b991b4df0c51f388a9e27"),
+    (16, "ebbd822fa458daf6dfdad7c27da76338"),
+    (20, "0412ca150bbf79058d8c75a58c993f55"),
+    (32, "e97ac04e9e5e3399ce5355cd7407bc75"),
+    (34, "5cba7d5eb24f7c86ccc54604e53d5512"),
+    (None, "c2c9fa1d9985f6f0d2aff915a0e8d910"),
+)
+
+_PreparedKey = namedtuple("_PreparedKey", ["algorithm", "k1", "k2", "powers", "l_inverse", "offsets",
+                                           "offset_blocks"])
+
+
+def _double(x):
+    """
+    Multiplies a 128-bit block (as an int) by x in GF(2 ** 128).
+    """
+    return ((x << 1) & _MASK) ^ (_R if x >> 127 else 0)
+
+
+def _encrypt_block(algorithm, block):
+    encryptor = Cipher(algorithm, modes.ECB()).encryptor()
+    return encryptor.update(block) + encryptor.finalize()
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def prepare_key(key):
+    """
+    Derives everything CMAC and PMAC need from an AES key, once per key.
+
+    L = AES(K, 0) is computed once, and from it CMAC's subkeys K1 = L * x and K2 = L * x ** 2 (NIST SP 800-38B),
+    PMAC's L * x ** i for every i, L * x ** -1 and the table of offsets of one chunk.
+    """
+    algorithm = algorithms.AES(key)
+    l_block = int.from_bytes(_encrypt_block(algorithm, bytes(BLOCK)), "big")
+    k1 = _double(l_block)
+    k2 = _double(k1)
+    powers = [l_block]
+    for _ in range(127):
+        powers.append(_double(powers[-1]))
+    l_inverse = (l_block >> 1) ^ (_R_INVERSE if l_block & 1 else 0)
+    # offsets[j] is the offset of block j of a chunk that starts at a multiple of PMAC_CHUNK_BLOCKS, apart from the
+    # chunk's own base offset (see _pmac_chunk()).
+    offsets = bytearray(PMAC_CHUNK_BLOCKS * BLOCK)
+    offset = 0
+    for j in range(1, PMAC_CHUNK_BLOCKS):
+        offset ^= powers[(j & -j).bit_length() - 1]
+        offsets[j * BLOCK:(j + 1) * BLOCK] = offset.to_bytes(BLOCK, "big")
+    # With NumPy the table is kept as pairs of 64-bit words, one row per block; without it as one big integer.
+    offset_blocks = np.frombuffer(bytes(offsets), dtype=np.uint64).reshape(-1, 2) if np is not None else None
+    return _PreparedKey(algorithm, k1.to_bytes(BLOCK, "big"), k2.to_bytes(BLOCK, "big"), powers,
+                        l_inverse.to_bytes(BLOCK, "big"), int.from_bytes(offsets, "big"), offset_blocks)
+
+
+def _xor(a, b):
+    return (int.from_bytes(a, "big") ^ int.from_bytes(b, "big")).to_bytes(len(a), "big")
+
+
+def _pad(block):
+    return bytes(block) + b"\x80" + bytes(BLOCK - 1 - len(block))
+
+
+class CMAC:
+    """
+    AES-CMAC (NIST SP 800-38B, RFC 4493) with a hashlib-style streaming interface.
+
+    Memory use is constant: the data is pushed through AES-CBC as it arrives and only the last, possibly partial,
+    block is held back, because it is the one that gets K1 or K2 mixed in.
+
+    Example:
+
+        mac = CMAC(key)
+        for chunk in chunks:
+            mac.update(chunk)
+        tag = mac.digest()
+    """
+
+    digest_size = BLOCK
+
+    def __init__(self, key, data=b""):
+        """
+        Args:
+            key (bytes): An AES key (16, 24 or 32 bytes).
+            data (bytes-like): Optional first data.
+        """
+        self._key = prepare_key(bytes(key))
+        self._encryptor = Cipher(self._key.algorithm, modes.CBC(bytes(BLOCK))).encryptor()
+        self._output = bytearray()
+        self._state = bytes(BLOCK)
+        self._pending = b""
+        self._done = False
+        self.update(data)
+
+    def update(self, data):
+        """
+        Adds data (bytes-like) to the message.
+        """
+        if self._done:
+            raise ValueError("The MAC has already been computed.")
+        data = memoryview(data).cast("B")
+        if len(self._pending) + len(data) <= BLOCK:
+            self._pending = bytes(self._pending) + bytes(data)
+            return
+        if self._pending:
+            # Complete the pending block from the new data and feed it.
+            fill = BLOCK - len(self._pending)
+            self._feed(bytes(self._pending) + bytes(data[:fill]))
+            data = data[fill:]
+        # Feed whole blocks, keeping at least one byte and at most one block back.
+        keep = (len(data) - 1) % BLOCK + 1
+        for start in range(0, len(data) - keep, FEED_SIZE):
+            self._feed(data[start:min(start + FEED_SIZE, len(data) - keep)])
+        self._pending = bytes(data[len(data) - keep:])
+
+    def _feed(self, blocks):
+        if len(self._output) < len(blocks) + BLOCK:
+            # Grows at most to FEED_SIZE + BLOCK, so short messages never allocate a large buffer.
+            self._output = bytearray(len(blocks) + BLOCK)
+        written = self._encryptor.update_into(blocks, self._output)
+        self._state = bytes(self._output[written - BLOCK:written])
+
+    def digest(self):
+        """
+        Returns the 16-byte tag. The object cannot be updated afterwards.
+        """
+        if not self._done:
+            if len(self._pending) == BLOCK:
+                last = _xor(self._pending, self._key.k1)
+            else:
+                last = _xor(_pad(self._pending), self._key.k2)
+            self._feed(last)
+            self._tag = self._state
+            self._done = True
+        return self._tag
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+    def verify(self, tag):
+        """
+        Checks a tag in constant time.
+        """
+        return hmac.compare_digest(self.digest(), tag)
+
+
+def _xor_fold(data):
+    """
+    Returns the XOR of all the 16-byte blocks of data, as an int.
+
+    The buffer is folded in half with one big-integer XOR at a time, so there is no Python loop over the blocks.
+    """
+    result = 0
+    while len(data) > BLOCK:
+        if len(data) // BLOCK % 2:
+            result ^= int.from_bytes(data[-BLOCK:], "big")
+            data = data[:-BLOCK]
+        half = len(data) // 2
+        data = (int.from_bytes(data[:half], "big") ^ int.from_bytes(data[half:], "big")).to_bytes(half, "big")
+    return result ^ int.from_bytes(data, "big")
+
+
+def _pmac_chunk(key, first, blocks):
+    """
+    Returns the XOR of AES(K, M[i] ^ offset(i)) over the blocks of blocks, whose first block has index first.
+
+    The offset of block i is the XOR of L * x ** b over the bits b of gray(i) = i ^ (i >> 1). Within a chunk that
+    starts at a multiple c of PMAC_CHUNK_BLOCKS, gray(c + j) = gray(c) ^ gray(j), so every offset is the chunk's
+    base offset XOR a table entry: both are applied to the whole chunk with two XORs, and the whole chunk is
+    encrypted with one call to AES-ECB.
+
+    With NumPy the masking and the final XOR are vectorized over the blocks; without it, they are done on the
+    whole chunk as one big integer.
+    """
+    count = len(blocks) // BLOCK
+    j = first % PMAC_CHUNK_BLOCKS
+    base = first - j
+    gray = base ^ (base >> 1)
+    base_offset = 0
+    while gray:
+        low = gray & -gray
+        base_offset ^= key.powers[low.bit_length() - 1]
+        gray ^= low
+    encryptor = Cipher(key.algorithm, modes.ECB()).encryptor()
+    if np is not None:
+        masked = np.frombuffer(blocks, dtype=np.uint64).reshape(-1, 2) ^ key.offset_blocks[j:j + count]
+        masked ^= np.frombuffer(base_offset.to_bytes(BLOCK, "big"), dtype=np.uint64)
+        words = np.frombuffer(encryptor.update(memoryview(masked).cast("B")), dtype=np.uint64)
+        # Reducing the even and the odd words separately is much faster than reducing a (count, 2) array by rows.
+        folded = np.array([np.bitwise_xor.reduce(words[0::2]), np.bitwise_xor.reduce(words[1::2])], dtype=np.uint64)
+        return int.from_bytes(folded.tobytes(), "big")
+    size = count * BLOCK
+    table = (key.offsets >> ((PMAC_CHUNK_BLOCKS - j - count) * 8 * BLOCK)) & ((1 << (8 * size)) - 1)
+    masked = int.from_bytes(blocks, "big") ^ table ^ int.from_bytes(base_offset.to_bytes(BLOCK, "big") * count, "big")
+    return _xor_fold(encryptor.update(masked.to_bytes(size, "big")))
+
+
+class PMAC:
+    """
+    PMAC1 (Rogaway), a parallelizable MAC, on AES.
+
+    Unlike CMAC, no block depends on the one before it: every block is masked with an offset that depends only on
+    its index, encrypted, and the results are XORed together. Chunks of the message are therefore processed on a
+    thread pool in any order; OpenSSL and NumPy release the GIL while they work on a chunk.
+
+    The interface is the same as CMAC's. The tags are not interchangeable with CMAC tags. The thread pool is only
+    started once a message spans more than one chunk, and is shut down by digest(), close(), a with block or garbage
+    collection, whichever comes first.
+    """
+
+    digest_size = BLOCK
+
+    def __init__(self, key, data=b"", workers=None):
+        """
+        Args:
+            key (bytes): An AES key (16, 24 or 32 bytes).
+            data (bytes-like): Optional first data.
+            workers (int): The number of threads (default: one per CPU; 1 computes in the calling thread).
+        """
+        self._executor = None
+        self._key = prepare_key(bytes(key))
+        self._workers = workers or os.cpu_count() or 1
+        self._sum = 0
+        # Block indices start at 1; _next is the index of the first pending block.
+        self._next = 1
+        self._pending = b""
+        self._done = False
+        self.update(data)
+
+    def update(self, data):
+        """
+        Adds data (bytes-like) to the message, processing every complete chunk on the thread pool.
+        """
+        if self._done:
+            raise ValueError("The MAC has already been computed.")
+        data = memoryview(data).cast("B")
+        if self._pending:
+            fill = min(BLOCK - len(self._pending), len(data))
+            self._pending += bytes(data[:fill])
+            data = data[fill:]
+            if not data:
+                return
+            # More data follows, so the pending block is complete and not the last one.
+            self._sum ^= _pmac_chunk(self._key, self._next, self._pending)
+            self._next += 1
+            self._pending = b""
+        # The last block is held back for digest(), like in CMAC.
+        ready = (len(data) - 1) // BLOCK if data else 0
+        jobs = []
+        index = self._next
+        start = 0
+        while start < ready * BLOCK:
+            # Chunks end on multiples of PMAC_CHUNK_BLOCKS, so each one needs a single base offset.
+            count = min(PMAC_CHUNK_BLOCKS - index % PMAC_CHUNK_BLOCKS, ready - start // BLOCK)
+            jobs.append((index, data[start:start + count * BLOCK]))
+            index += count
+            start += count * BLOCK
+        if self._workers > 1 and len(jobs) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers)
+            results = self._executor.map(lambda job: _pmac_chunk(self._key, *job), jobs)
+        else:
+            results = (_pmac_chunk(self._key, *job) for job in jobs)
+        for result in results:
+            self._sum ^= result
+        self._next = index
+        self._pending = bytes(data[start:])
+
+    def digest(self):
+        """
+        Returns the 16-byte tag. The object cannot be updated afterwards.
+        """
+        if not self._done:
+            if len(self._pending) == BLOCK:
+                last = int.from_bytes(_xor(self._pending, self._key.l_inverse), "big")
+            else:
+                last = int.from_bytes(_pad(self._pending), "big")
+            self._tag = _encrypt_block(self._key.algorithm, (self._sum ^ last).to_bytes(BLOCK, "big"))
+            self._done = True
+            self.close()
+        return self._tag
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+    def verify(self, tag):
+        """
+        Checks a tag in constant time.
+        """
+        return hmac.compare_digest(self.digest(), tag)
+
+    def close(self):
+        """
+        Shuts the thread pool down, if one was started. update() starts a new one if it is needed again.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+def cmac(key, data):
+    """
+    Returns the AES-CMAC tag of data.
+    """
+    return CMAC(key, data).digest()
+
+
+def pmac(key, data, workers=None):
+    """
+    Returns the PMAC tag of data, computed on workers threads.
+    """
+    return PMAC(key, data, workers).digest()
+
+
+def mac_file(path, key, mode="cmac", workers=None, read_size=8 << 20):
+    """
+    Computes the CMAC or PMAC tag of a file of any size, reading it read_size bytes at a time.
+    """
+    mac = CMAC(key) if mode == "cmac" else PMAC(key, workers=workers)
+    with open(path, "rb") as f:
+        while chunk := f.read(read_size):
+            mac.update(chunk)
+    return mac.digest()
+
+
+def self_test():
+    """
+    Checks CMAC and PMAC against their known answers, and checks that feeding a message in uneven pieces, across
+    PMAC's chunk boundaries and on several threads, gives the same tags as a single call.
+
+    Raises:
+        AssertionError: If any tag is wrong.
+    """
+    for key, message, tag in CMAC_VECTORS:
+        key, message = bytes.fromhex(key), bytes.fromhex(message)
+        if cmac(key, message).hex() != tag:
+            raise AssertionError(f"CMAC: wrong tag for the {len(key) * 8}-bit key and a {len(message)}-byte message")
+    key = bytes(range(16))
+    for length, tag in PMAC_VECTORS:
+        message = bytes(1000) if length is None else bytes(range(length))
+        if pmac(key, message, workers=1).hex() != tag:
+            raise AssertionError(f"PMAC: wrong tag for a {len(message)}-byte message")
+    message = os.urandom(3 * PMAC_CHUNK_BLOCKS * BLOCK + 5)
+    for mode, workers in (("cmac", None), ("pmac", 1), ("pmac", 4)):
+        expected = cmac(key, message) if mode == "cmac" else pmac(key, message, workers)
+        mac = CMAC(key) if mode == "cmac" else PMAC(key, workers=workers)
+        for start, end in ((0, 1), (1, 17), (17, 70000), (70000, len(message))):
+            mac.update(message[start:end])
+        if mac.digest() != expected:
+            raise AssertionError(f"{mode.upper()}: streaming gave a different tag")
+    return len(CMAC_VECTORS) + len(PMAC_VECTORS)
+
+
+def benchmark(size=256 << 20, workers_list=None, messages=100000):
+    """
+    Prints the throughput of serial CMAC and of PMAC on increasing numbers of threads, and the rate of short
+    messages, where the cached subkeys matter most.
+    """
+    if workers_list is None:
+        workers_list = sorted({1, 2, 4, os.cpu_count() or 1})
+    key = os.urandom(16)
+    data = memoryview(os.urandom(size))
+    start = time.perf_counter()
+    mac = CMAC(key)
+    for i in range(0, size, 8 << 20):
+        mac.update(data[i:i + (8 << 20)])
+    mac.digest()
+    serial = size / (time.perf_counter() - start)
+    print(f"{size / 1e6:.0f} MB message, AES-128")
+    print(f"  CMAC (serial)        {serial / 1e6:10.1f} MB/s")
+    for workers in workers_list:
+        start = time.perf_counter()
+        mac = PMAC(key, workers=workers)
+        for i in range(0, size, 8 << 20):
+            mac.update(data[i:i + (8 << 20)])
+        mac.digest()
+        rate = size / (time.perf_counter() - start)
+        print(f"  PMAC, {workers:>3} thread(s) {rate / 1e6:10.1f} MB/s  {rate / serial:5.2f}x")
+    record = os.urandom(64)
+    start = time.perf_counter()
+    for _ in range(messages):
+        cmac(key, record)
+    print(f"  CMAC of 64-byte messages: {messages / (time.perf_counter() - start):,.0f}/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute AES-CMAC or PMAC tags of files.")
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("-k", "--key", help="the AES key, in hex (16, 24 or 32 bytes)")
+    parser.add_argument("-m", "--mode", choices=["cmac", "pmac"], default="cmac")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="threads for pmac")
+    parser.add_argument("--benchmark", action="store_true", help="compare PMAC on 1..n threads with serial CMAC")
+    parser.add_argument("--self-test", action="store_true", help="check CMAC and PMAC against known answers")
+    parser.add_argument("--size", type=int, default=256 << 20, help="benchmark message size in bytes")
+    args = parser.parse_intermixed_args(argv)
+
+    if args.self_test:
+        print(f"{self_test()} known-answer tests passed")
+        return 0
+    if args.benchmark:
+        benchmark(args.size)
+        return 0
+    if not (args.key and args.files):
+        parser.error("--key and at least one file are required")
+    key = bytes.fromhex(args.key)
+    for path in args.files:
+        print(f"{mac_file(path, key, args.mode, args.workers).hex()}  {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+"""
+Here's how CMAC and PMAC are implemented (see CMAC.md for CMAC itself):
+
+1. prepare_key() encrypts the zero block once per key and derives CMAC's subkeys K1 and K2 by doubling in
+   GF(2 ** 128), plus what PMAC needs (L * x ** i, L * x ** -1 and a 64 KiB table of offsets). Keys are kept in an
+   LRU cache, so a MAC of a short message costs one CBC pass rather than an extra AES call and two doublings.
+2. CMAC streams the message through OpenSSL's AES-CBC with a zero IV, through one reusable output buffer, and holds
+   back only the last block, which is XORed with K1 (if complete) or padded and XORed with K2. Memory use does not
+   depend on the message size, and the tags match RFC 4493.
+3. CMAC is inherently serial: each block is encrypted after the previous one. PMAC masks each block with an offset
+   that depends only on its position, encrypts it, and XORs all the results, so any chunk can be computed
+   independently. Offsets follow the Gray code of the block index, which lets a whole 64 KiB chunk be masked with
+   two XORs (NumPy, or big integers without it) and encrypted with one AES-ECB call. Chunks run on a thread pool.
+4. benchmark() measures serial CMAC against PMAC on 1, 2, 4 and all cores. On a single core PMAC is slower than
+   CMAC, whose CBC loop runs entirely inside OpenSSL, because the masking and folding are extra passes over the
+   data; its throughput grows with the number of cores, while CMAC cannot use more than one.
+5. self_test() (--self-test) checks CMAC against the examples of RFC 4493 and NIST SP 800-38B and PMAC against the
+   published PMAC-AES-128 test vectors, and checks that streaming a message in uneven pieces gives the same tags.
+
+Examples:
+
+    python cmac_pmac.py -k 2b7e151628aed2a6abf7158809cf4f3c backup.tar
+    python cmac_pmac.py -k 2b7e151628aed2a6abf7158809cf4f3c backup.tar --mode pmac -j 8
+    python cmac_pmac.py --benchmark --size 1073741824
+    python cmac_pmac.py --self-test
+"""